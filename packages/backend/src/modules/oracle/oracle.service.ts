@@ -1,6 +1,7 @@
 import { Injectable, BadRequestException, Inject } from '@nestjs/common';
 import { ConfigService } from '@nestjs/config';
 import { HttpService } from '@nestjs/axios';
+import { Property } from '@prisma/client';
 import { PrismaService } from '../../common/prisma/prisma.service';
 import { ethers } from 'ethers';
 import { firstValueFrom } from 'rxjs';
@@ -56,19 +57,30 @@ export class OracleService {
   async collectValuationData(spvId: string) {
     // Get valuation from ML service
     const mlServiceUrl = this.configService.get<string>('ML_SERVICE_URL');
-    
+    const properties = await this.prisma.property.findMany({
+      where: { spvId },
+    });
+
+    if (properties.length === 0) {
+      throw new BadRequestException(`SPV ${spvId} has no properties to value`);
+    }
+
     try {
-      const response = await firstValueFrom(
-        this.httpService.get(`${mlServiceUrl}/api/v1/avm/${spvId}`),
-      );
+      // The ML service keeps portfolios in memory per replica. Register this SPV's
+      // properties when the replica has none (after a restart, or it never saw the
+      // SPV) or is missing properties added since; the PUT returns the valuation.
+      let valuation = await this.getPortfolioValuation(mlServiceUrl, spvId);
+      if (!valuation || valuation.properties_count !== properties.length) {
+        valuation = await this.registerPortfolio(mlServiceUrl, spvId, properties);
+      }
 
       return {
         spvId,
         dataType: 'NAV_VALUATION',
-        value: response.data.value,
-        lowerCI: response.data.lower_ci,
-        upperCI: response.data.upper_ci,
-        confidence: response.data.confidence,
+        value: valuation.value,
+        lowerCI: valuation.lower_ci,
+        upperCI: valuation.upper_ci,
+        confidence: valuation.confidence,
         timestamp: new Date(),
       };
     } catch (error) {
@@ -188,6 +200,51 @@ export class OracleService {
     return data;
   }
 
+  private async getPortfolioValuation(mlServiceUrl: string, spvId: string) {
+    try {
+      const response = await firstValueFrom(
+        this.httpService.get(`${mlServiceUrl}/api/v1/avm/${spvId}`),
+      );
+      return response.data;
+    } catch (error) {
+      if (error.response?.status === 404) {
+        return null;
+      }
+      throw error;
+    }
+  }
+
+  private async registerPortfolio(mlServiceUrl: string, spvId: string, properties: Property[]) {
+    const response = await firstValueFrom(
+      this.httpService.put(`${mlServiceUrl}/api/v1/avm/${spvId}/properties`, {
+        properties: properties.map((property) => ({
+          property_id: property.id,
+          property_data: this.toPropertyData(property),
+        })),
+      }),
+    );
+    return response.data;
+  }
+
+  private toPropertyData(property: Property) {
+    // Fields left out take the AVM's defaults
+    const data: Record<string, unknown> = {
+      area: property.area,
+      purchase_price: property.purchasePrice,
+      type: property.propertyType,
+    };
+    if (property.monthlyRent != null) {
+      data.monthly_rent = property.monthlyRent;
+    }
+    if (property.occupancyRate != null) {
+      data.occupancy_rate = property.occupancyRate;
+    }
+    if (property.latitude != null && property.longitude != null) {
+      data.location = { lat: property.latitude, lon: property.longitude };
+    }
+    return data;
+  }
+
   private async getRentFromBank(spvId: string) {
     // Simplified bank API integration
     // In production, use proper bank API
@@ -0,0 +1,329 @@
+"""
+Admission Control
+Per-client rate limits, an adaptive concurrency limit and priority classes for the ML API
+"""
+
+import asyncio
+import json
+import math
+import os
+import time
+import logging
+from collections import OrderedDict, deque
+from typing import Deque, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Priority classes, most important first
+INTERACTIVE = "interactive"
+BULK = "bulk"
+TRAINING = "training"
+PRIORITIES = (INTERACTIVE, BULK, TRAINING)
+
+# Probes, metrics and docs are never limited
+EXEMPT_PATHS = {"/live", "/ready", "/health", "/metrics", "/docs", "/redoc", "/openapi.json"}
+
+# Bulk routes besides the _batch and _stream endpoints
+BULK_PATHS = {"/api/v1/maintenance/schedule", "/api/v1/risk/sensitivity", "/api/v1/risk/stress_test"}
+
+
+def classify(method: str, path: str) -> Optional[str]:
+    """Priority class of a request, or None if it is exempt"""
+    if path in EXEMPT_PATHS:
+        return None
+    if path.startswith("/api/v1/models/train") or path == "/api/v1/models/reload":
+        return TRAINING
+    if (path.endswith(("_batch", "_stream")) or path in BULK_PATHS
+            or (method == "PUT" and path.endswith("/properties"))):
+        return BULK
+    return INTERACTIVE
+
+
+class TokenBucket:
+    """Refills rate tokens per second up to burst; one token per request"""
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: float, now: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+
+    def take(self, now: float) -> float:
+        """Take a token; returns 0 on success, else seconds until one is available"""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return 0.0
+        return (1.0 - self.tokens) / self.rate
+
+
+class RateLimiter:
+    """
+    Token buckets per (client, priority class). Buckets are kept for the
+    most recently seen max_clients clients; an evicted client starts again
+    with a full bucket, so eviction can only be lenient.
+    """
+
+    def __init__(self, rates: Dict[str, float], burst_seconds: float = 2.0, max_clients: int = 10000):
+        self.rates = rates
+        self.burst_seconds = burst_seconds
+        self.max_clients = max_clients
+        self._buckets: "OrderedDict[Tuple[str, str], TokenBucket]" = OrderedDict()
+
+    def check(self, client: str, priority: str) -> float:
+        """0 if the request may proceed, else seconds until the client may retry"""
+        rate = self.rates.get(priority, 0.0)
+        if rate <= 0:
+            return 0.0
+        now = time.monotonic()
+        key = (client, priority)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(rate, max(1.0, rate * self.burst_seconds), now)
+            if len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        return bucket.take(now)
+
+
+class AdaptiveLimit:
+    """
+    Concurrency limit that follows observed latency (a gradient limiter).
+
+    The smoothed latency of recent requests is compared with a baseline,
+    the lowest smoothed latency seen over the last one to two windows,
+    which stands for the service's unloaded latency. While recent latency
+    stays within tolerance times the baseline the limit grows by about
+    sqrt(limit) per sample, probing for capacity; beyond it the limit
+    shrinks in proportion (at most halving per sample), so in-flight work,
+    and with it the latency of admitted requests, stays bounded. Only
+    interactive requests are sampled, since batch latency scales with
+    batch size rather than load.
+    """
+
+    def __init__(self, initial: int = 64, min_limit: int = 8, max_limit: int = 512,
+                 tolerance: float = 2.0, smoothing: float = 0.2, window: float = 10.0):
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.tolerance = tolerance
+        self.smoothing = smoothing
+        self.window = window
+        self.latency: Optional[float] = None
+        self._window_started = time.monotonic()
+        self._window_min = math.inf
+        self._previous_min = math.inf
+
+    @property
+    def baseline(self) -> Optional[float]:
+        baseline = min(self._window_min, self._previous_min)
+        return None if baseline == math.inf else baseline
+
+    def observe(self, latency: float):
+        self.latency = latency if self.latency is None else self.latency + 0.1 * (latency - self.latency)
+        now = time.monotonic()
+        if now - self._window_started > self.window:
+            # The baseline forgets old windows, so it can rise if the service slows down for good
+            self._previous_min, self._window_min = self._window_min, math.inf
+            self._window_started = now
+        self._window_min = min(self._window_min, self.latency)
+
+        gradient = max(0.5, min(1.0, self.tolerance * self.baseline / self.latency)) if self.latency > 0 else 1.0
+        target = self.limit * gradient + math.sqrt(self.limit)
+        self.limit += self.smoothing * (target - self.limit)
+        self.limit = max(self.min_limit, min(self.max_limit, self.limit))
+
+    @property
+    def value(self) -> int:
+        return int(self.limit)
+
+
+class AdmissionController:
+    """
+    Decides whether a request is admitted, queued briefly or rejected.
+
+    Every class draws from one adaptive concurrency limit, but bulk and
+    training requests may only fill bulk_share and training_share of it,
+    so the remaining slots are always free for interactive calls. A full
+    limit rejects bulk and training at once (503) and lets interactive
+    requests wait up to max_wait for a slot, handed out in arrival order.
+    Per-client token buckets reject clients over their rate with 429.
+    """
+
+    def __init__(self, limiter: RateLimiter, limit: AdaptiveLimit, bulk_share: float = 0.5,
+                 training_share: float = 0.1, max_wait: float = 0.05):
+        self.limiter = limiter
+        self.limit = limit
+        self.shares = {INTERACTIVE: 1.0, BULK: bulk_share, TRAINING: training_share}
+        self.max_wait = max_wait
+        self.in_flight = {priority: 0 for priority in PRIORITIES}
+        self._waiters: Deque[asyncio.Future] = deque()
+
+        # Metrics
+        self.admitted = {priority: 0 for priority in PRIORITIES}
+        self.rejected = {(priority, reason): 0 for priority in PRIORITIES for reason in ("rate_limited", "overloaded")}
+
+    @property
+    def total_in_flight(self) -> int:
+        return sum(self.in_flight.values())
+
+    def _has_slot(self, priority: str) -> bool:
+        limit = self.limit.value
+        if self.total_in_flight >= limit:
+            return False
+        return self.in_flight[priority] < max(1, int(limit * self.shares[priority]))
+
+    async def acquire(self, client: str, priority: str) -> Optional[Tuple[int, str, float]]:
+        """
+        None once a slot is held (release it with release), else
+        (status, reason, retry_after seconds) for the rejection.
+        """
+        retry_after = self.limiter.check(client, priority)
+        if retry_after > 0:
+            self.rejected[(priority, "rate_limited")] += 1
+            return 429, "rate_limited", retry_after
+
+        if not self._has_slot(priority) or (priority == INTERACTIVE and self._waiters):
+            if priority != INTERACTIVE or self.max_wait <= 0:
+                self.rejected[(priority, "overloaded")] += 1
+                return 503, "overloaded", 1.0
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await asyncio.wait_for(asyncio.shield(waiter), self.max_wait)
+            except asyncio.TimeoutError:
+                if not waiter.done():
+                    waiter.cancel()
+                    self.rejected[(priority, "overloaded")] += 1
+                    return 503, "overloaded", 1.0
+            except asyncio.CancelledError:
+                # The client went away; give back a slot handed over meanwhile
+                if waiter.done() and not waiter.cancelled():
+                    self.release(priority)
+                raise
+            finally:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+            # A slot was handed over by release()
+            self.admitted[priority] += 1
+            return None
+
+        self.in_flight[priority] += 1
+        self.admitted[priority] += 1
+        return None
+
+    def release(self, priority: str, latency: Optional[float] = None):
+        """Free a slot; latency (of a completed interactive request) feeds the limit"""
+        if latency is not None:
+            self.limit.observe(latency)
+        self.in_flight[priority] -= 1
+        # Hand the slot straight to the oldest waiting interactive request
+        while self._waiters and self._has_slot(INTERACTIVE):
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight[INTERACTIVE] += 1
+                waiter.set_result(None)
+
+    def stats(self) -> Dict:
+        return {
+            "limit": self.limit.value,
+            "in_flight": dict(self.in_flight),
+            "waiting": len(self._waiters),
+            "latency_ms": None if self.limit.latency is None else self.limit.latency * 1000,
+            "baseline_latency_ms": None if self.limit.baseline is None else self.limit.baseline * 1000,
+            "admitted": dict(self.admitted),
+            "rejected": {f"{priority}:{reason}": n for (priority, reason), n in self.rejected.items()},
+        }
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware applying an AdmissionController to HTTP requests.
+    Clients are identified by client_header when present (set by the API
+    gateway), else by peer address. Rejections are answered without
+    touching the application, with a FastAPI-style {"detail"} body and
+    Retry-After.
+    """
+
+    def __init__(self, app, controller: AdmissionController, client_header: str = "x-client-id"):
+        self.app = app
+        self.controller = controller
+        self.client_header = client_header.lower().encode()
+
+    def _client(self, scope) -> str:
+        for key, value in scope.get("headers", ()):
+            if key == self.client_header:
+                return value.decode("latin-1")
+        client = scope.get("client")
+        return client[0] if client else "unknown"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        priority = classify(scope["method"], scope["path"])
+        if priority is None:
+            await self.app(scope, receive, send)
+            return
+
+        rejection = await self.controller.acquire(self._client(scope), priority)
+        if rejection is not None:
+            status, reason, retry_after = rejection
+            detail = "Rate limit exceeded" if status == 429 else "Service overloaded, retry later"
+            body = json.dumps({"detail": detail, "reason": reason, "priority": priority}).encode()
+            await send({
+                "type": "http.response.start",
+                "status": status,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+                ],
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        started = time.perf_counter()
+        completed = False
+        try:
+            await self.app(scope, receive, send)
+            completed = True
+        finally:
+            latency = time.perf_counter() - started if completed and priority == INTERACTIVE else None
+            self.controller.release(priority, latency)
+
+
+def admission_from_env() -> Optional[AdmissionController]:
+    """
+    Build an AdmissionController from ML_ADMISSION_* environment variables,
+    or None when ML_ADMISSION_ENABLED is false. Rates are requests per
+    second per client and are off (0) unless set: callers that send no
+    client header all share their pod's address, so a per-client rate would
+    throttle the whole backend. The adaptive concurrency limit is always on.
+    """
+    if os.getenv("ML_ADMISSION_ENABLED", "true").lower() != "true":
+        return None
+    limiter = RateLimiter(
+        rates={
+            INTERACTIVE: float(os.getenv("ML_ADMISSION_RATE_INTERACTIVE", "0")),
+            BULK: float(os.getenv("ML_ADMISSION_RATE_BULK", "0")),
+            TRAINING: float(os.getenv("ML_ADMISSION_RATE_TRAINING", "0")),
+        },
+        burst_seconds=float(os.getenv("ML_ADMISSION_BURST_SECONDS", "2")),
+    )
+    limit = AdaptiveLimit(
+        initial=int(os.getenv("ML_ADMISSION_INITIAL_LIMIT", "64")),
+        min_limit=int(os.getenv("ML_ADMISSION_MIN_LIMIT", "8")),
+        max_limit=int(os.getenv("ML_ADMISSION_MAX_LIMIT", "512")),
+        tolerance=float(os.getenv("ML_ADMISSION_LATENCY_TOLERANCE", "2.0")),
+    )
+    return AdmissionController(
+        limiter,
+        limit,
+        bulk_share=float(os.getenv("ML_ADMISSION_BULK_SHARE", "0.5")),
+        training_share=float(os.getenv("ML_ADMISSION_TRAINING_SHARE", "0.1")),
+        max_wait=float(os.getenv("ML_ADMISSION_MAX_WAIT_MS", "50")) / 1000,
+    )
@@ -0,0 +1,149 @@
+"""
+Dynamic Micro-Batching
+Coalesces concurrent single-item predictions into one batched model call
+"""
+
+import asyncio
+import os
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the batch size histogram buckets
+BATCH_SIZE_BUCKETS = [1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024]
+
+
+class MicroBatcher:
+    """
+    Gathers rows submitted by concurrent requests for up to max_batch_size
+    items or max_wait_ms milliseconds, stacks them into one matrix and runs
+    batch_fn once. Each caller receives its own row of the result.
+
+    batch_fn is an async callable taking an (N, F) matrix and the context
+    the rows were submitted with, and returning a sequence of N results.
+    Rows are only stacked with rows of the same context (e.g. the model
+    bundle a request leased), so a flush that spans a model swap makes one
+    call per context. If batch_fn raises, every caller in that call
+    receives the exception.
+    """
+
+    def __init__(self, name: str, batch_fn: Callable[[np.ndarray, Any], Awaitable],
+                 max_batch_size: int = 64, max_wait_ms: float = 2.0):
+        self.name = name
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+
+        self._pending: List = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks = set()
+
+        # Metrics
+        self.batches = 0
+        self.items = 0
+        self.flushes_full = 0
+        self.flushes_timeout = 0
+        self.max_observed = 0
+        self.size_counts = [0] * (len(BATCH_SIZE_BUCKETS) + 1)
+
+    async def submit(self, row: np.ndarray, context: Any = None):
+        """Queue one feature row and wait for its prediction under context"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((row, context, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush(full=True)
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+
+        return await future
+
+    def _flush(self, full: bool = False):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+
+        batch = self._pending[:self.max_batch_size]
+        self._pending = self._pending[self.max_batch_size:]
+        if self._pending:
+            self._timer = asyncio.get_running_loop().call_later(self.max_wait, self._flush)
+
+        self._record(len(batch), full)
+        task = asyncio.ensure_future(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List):
+        # Callers that went away (e.g. client disconnects) are dropped from the batch
+        groups: Dict[int, List] = {}
+        for row, context, future in batch:
+            if not future.done():
+                groups.setdefault(id(context), []).append((row, context, future))
+        await asyncio.gather(*(self._run_group(group) for group in groups.values()))
+
+    async def _run_group(self, group: List):
+        try:
+            results = await self.batch_fn(np.vstack([row for row, _, _ in group]), group[0][1])
+        except Exception as e:
+            for _, _, future in group:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, _, future), result in zip(group, results):
+            if not future.done():
+                future.set_result(result)
+
+    @property
+    def pending(self) -> int:
+        """Rows waiting for their batch to be flushed"""
+        return len(self._pending)
+
+    def _record(self, size: int, full: bool):
+        self.batches += 1
+        self.items += size
+        self.max_observed = max(self.max_observed, size)
+        if full:
+            self.flushes_full += 1
+        else:
+            self.flushes_timeout += 1
+        for i, bound in enumerate(BATCH_SIZE_BUCKETS):
+            if size <= bound:
+                self.size_counts[i] += 1
+                break
+        else:
+            self.size_counts[-1] += 1
+
+    def stats(self) -> Dict:
+        labels = [f"<={bound}" for bound in BATCH_SIZE_BUCKETS] + [f">{BATCH_SIZE_BUCKETS[-1]}"]
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch_size": self.items / self.batches if self.batches else 0.0,
+            "max_observed_batch_size": self.max_observed,
+            "flushes_full": self.flushes_full,
+            "flushes_timeout": self.flushes_timeout,
+            "pending": self.pending,
+            "batch_size_histogram": dict(zip(labels, self.size_counts)),
+        }
+
+
+def batcher_from_env(name: str, prefix: str, batch_fn: Callable[[np.ndarray, Any], Awaitable],
+                     max_batch_size: int = 64, max_wait_ms: float = 2.0) -> MicroBatcher:
+    """
+    Build a MicroBatcher configured by {prefix}_MAX_BATCH_SIZE and
+    {prefix}_MAX_WAIT_MS environment variables.
+    """
+    return MicroBatcher(
+        name,
+        batch_fn,
+        max_batch_size=int(os.getenv(f"{prefix}_MAX_BATCH_SIZE", max_batch_size)),
+        max_wait_ms=float(os.getenv(f"{prefix}_MAX_WAIT_MS", max_wait_ms)),
+    )
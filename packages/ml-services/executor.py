@@ -0,0 +1,152 @@
+"""
+Bounded Executors for CPU-bound Work
+Runs model inference and training off the asyncio event loop
+"""
+
+import asyncio
+import multiprocessing
+import os
+import threading
+import logging
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ExecutorSaturated(Exception):
+    """Raised when an executor's workers and queue are all occupied"""
+
+
+class ExecutorTimeout(Exception):
+    """Raised when a submitted task does not finish within its timeout"""
+
+
+class BoundedExecutor:
+    """
+    Thread or process pool with a bounded number of queued tasks.
+
+    At most max_workers + max_queue tasks are admitted at once; further
+    submissions fail immediately with ExecutorSaturated instead of queueing
+    without limit. A slot is released only when the underlying task actually
+    finishes, so timed-out tasks that are already running still count.
+    """
+
+    def __init__(self, name: str, kind: str = "thread", max_workers: Optional[int] = None,
+                 max_queue: int = 64, timeout: Optional[float] = 30.0):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown executor kind: {kind}")
+        self.name = name
+        self.kind = kind
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.capacity = self.max_workers + max_queue
+
+        self._slots = threading.BoundedSemaphore(self.capacity)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._completed = 0
+        self._rejected = 0
+        self._timed_out = 0
+        self._pool: Optional[Executor] = None
+
+    def _get_pool(self) -> Executor:
+        if self._pool is None:
+            if self.kind == "process":
+                # spawn avoids forking a process that already runs server threads
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            else:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix=f"{self.name}-worker"
+                )
+            logger.info(f"Started {self.kind} executor '{self.name}' "
+                        f"(workers={self.max_workers}, queue={self.max_queue})")
+        return self._pool
+
+    def _release(self, _future):
+        with self._lock:
+            self._pending -= 1
+            self._completed += 1
+        self._slots.release()
+
+    def submit(self, fn: Callable, *args) -> Future:
+        """Submit fn(*args) to the pool, raising ExecutorSaturated if no slot is free"""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            raise ExecutorSaturated(f"Executor '{self.name}' is saturated")
+
+        try:
+            future = self._get_pool().submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        with self._lock:
+            self._pending += 1
+        future.add_done_callback(self._release)
+        return future
+
+    async def run(self, fn: Callable, *args, timeout: Optional[float] = None):
+        """Run fn(*args) on the pool and await its result"""
+        return await self.wait(self.submit(fn, *args), timeout=timeout)
+
+    async def wait(self, future: Future, timeout: Optional[float] = None):
+        """Await a future returned by submit(), applying the executor timeout"""
+        timeout = self.timeout if timeout is None else timeout
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except asyncio.TimeoutError:
+            # Cancels the task if it is still queued; running tasks finish in the background
+            future.cancel()
+            with self._lock:
+                self._timed_out += 1
+            raise ExecutorTimeout(f"Executor '{self.name}' task timed out after {timeout}s")
+
+    @property
+    def pending(self) -> int:
+        """Tasks currently queued or running"""
+        return self._pending
+
+    @property
+    def saturation(self) -> float:
+        return self._pending / self.capacity
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "kind": self.kind,
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "pending": self._pending,
+                "saturation": self._pending / self.capacity,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "timed_out": self._timed_out,
+            }
+
+    def shutdown(self, wait: bool = True):
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait, cancel_futures=True)
+            self._pool = None
+
+
+def executor_from_env(name: str, prefix: str, kind: str = "thread", max_workers: Optional[int] = None,
+                      max_queue: int = 64, timeout: float = 30.0) -> BoundedExecutor:
+    """
+    Build a BoundedExecutor configured by environment variables:
+    {prefix}_EXECUTOR (thread|process), {prefix}_WORKERS, {prefix}_QUEUE_SIZE
+    and {prefix}_TIMEOUT (seconds).
+    """
+    workers = os.getenv(f"{prefix}_WORKERS")
+    return BoundedExecutor(
+        name,
+        kind=os.getenv(f"{prefix}_EXECUTOR", kind),
+        max_workers=int(workers) if workers else max_workers,
+        max_queue=int(os.getenv(f"{prefix}_QUEUE_SIZE", max_queue)),
+        timeout=float(os.getenv(f"{prefix}_TIMEOUT", timeout)),
+    )
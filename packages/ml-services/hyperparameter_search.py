@@ -0,0 +1,233 @@
+"""
+Hyperparameter Search
+Cross-validated search over tree ensemble hyperparameters on a process pool, with early pruning
+"""
+
+import math
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Configurations sampled per search, and cross-validation folds per configuration
+SEARCH_TRIALS = int(os.getenv("ML_SEARCH_TRIALS", "16"))
+SEARCH_FOLDS = int(os.getenv("ML_SEARCH_FOLDS", "5"))
+
+# Processes evaluating folds (default: one per core)
+SEARCH_WORKERS = int(os.getenv("ML_SEARCH_WORKERS", "0")) or os.cpu_count() or 1
+
+# MLflow tracking store the winning model is registered in (empty disables MLflow)
+SEARCH_TRACKING_URI = os.getenv("ML_SEARCH_TRACKING_URI", "file:///app/mlruns")
+
+# After each fold, only the best 1/PRUNE_FACTOR of the remaining trials (at
+# least MIN_SURVIVORS) are evaluated on the next fold
+PRUNE_FACTOR = 2
+MIN_SURVIVORS = 2
+
+# Candidate values per estimator class; configurations are sampled from the grid
+SEARCH_SPACES = {
+    "RandomForestRegressor": {
+        "n_estimators": [50, 100, 200],
+        "max_depth": [None, 8, 16, 32],
+        "min_samples_leaf": [1, 2, 4, 8],
+        "max_features": [1.0, "sqrt", 0.5],
+    },
+    "RandomForestClassifier": {
+        "n_estimators": [50, 100, 200],
+        "max_depth": [None, 8, 16, 32],
+        "min_samples_leaf": [1, 2, 4, 8],
+        "max_features": ["sqrt", 0.5, 1.0],
+    },
+    "GradientBoostingRegressor": {
+        "n_estimators": [100, 200, 400],
+        "learning_rate": [0.03, 0.1, 0.3],
+        "max_depth": [2, 3, 5],
+        "subsample": [0.7, 1.0],
+    },
+    "GradientBoostingClassifier": {
+        "n_estimators": [100, 200, 400],
+        "learning_rate": [0.03, 0.1, 0.3],
+        "max_depth": [2, 3, 5],
+        "subsample": [0.7, 1.0],
+    },
+}
+
+# Per-process fold data, set by _load_fold_data in each search worker
+_fold_data = None
+
+
+class Trial:
+    """One sampled configuration and its fold scores"""
+
+    def __init__(self, index: int, params: Dict):
+        self.index = index
+        self.params = params
+        self.scores: List[float] = []
+        self.seconds = 0.0
+        self.pruned = False
+
+    @property
+    def mean_score(self) -> float:
+        return float(np.mean(self.scores)) if self.scores else float("-inf")
+
+    def to_dict(self) -> Dict:
+        return {
+            "trial": self.index,
+            "params": self.params,
+            "status": "pruned" if self.pruned else "completed",
+            "folds": len(self.scores),
+            "mean_score": self.mean_score if self.scores else None,
+            "fold_scores": self.scores,
+            "seconds": self.seconds,
+        }
+
+
+def sample_trials(estimator, n_trials: int, seed: int = 42) -> List[Trial]:
+    """Distinct configurations sampled from the estimator's search space"""
+    from sklearn.model_selection import ParameterSampler
+
+    space = SEARCH_SPACES.get(type(estimator).__name__)
+    if space is None:
+        raise ValueError(f"No search space for {type(estimator).__name__}")
+    sampler = ParameterSampler(space, n_iter=n_trials, random_state=seed)
+    return [Trial(i, params) for i, params in enumerate(sampler)]
+
+
+def survivors(n_trials: int, n_folds: int) -> List[int]:
+    """Trials evaluated on each fold under the pruning schedule"""
+    counts = [n_trials]
+    for _ in range(n_folds - 1):
+        counts.append(min(counts[-1], max(MIN_SURVIVORS, math.ceil(counts[-1] / PRUNE_FACTOR))))
+    return counts
+
+
+def _load_fold_data(x_path: str, y_path: str, n_folds: int, classifier: bool):
+    """Search worker initializer: map the training matrix and split it once"""
+    global _fold_data
+    from sklearn.model_selection import KFold, StratifiedKFold
+
+    X = np.load(x_path, mmap_mode="r")
+    y = np.load(y_path)
+    splitter = (StratifiedKFold if classifier else KFold)(n_splits=n_folds, shuffle=True, random_state=42)
+    _fold_data = (X, y, list(splitter.split(np.empty((len(y), 0)), y)))
+
+
+def _evaluate(estimator, params: Dict, fold: int) -> Tuple[float, float]:
+    """Fit one configuration on one fold; returns (validation score, seconds)"""
+    from sklearn.base import clone
+
+    started = time.perf_counter()
+    X, y, splits = _fold_data
+    train, test = splits[fold]
+    model = clone(estimator).set_params(**params)
+    model.fit(X[train], y[train])
+    return float(model.score(X[test], y[test])), time.perf_counter() - started
+
+
+def run_search(estimator, X: np.ndarray, y: np.ndarray, n_trials: int = SEARCH_TRIALS,
+               n_folds: int = SEARCH_FOLDS, workers: int = SEARCH_WORKERS,
+               on_progress: Optional[Callable[[float], None]] = None) -> Tuple[Trial, List[Trial]]:
+    """
+    Cross-validated search over sampled configurations of estimator.
+
+    Folds are evaluated in rounds: every remaining trial is fitted on fold r
+    in parallel, then the trials with the worst mean score so far are pruned
+    (successive halving), so most of the compute goes to promising
+    configurations. Workers memory-map the matrix from a temporary .npy
+    instead of receiving a copy per task. Returns the best trial that
+    completed every fold, and all trials.
+    """
+    from sklearn.base import is_classifier
+
+    trials = sample_trials(estimator, n_trials)
+    schedule = survivors(len(trials), n_folds)
+    total = sum(schedule)
+    done = 0
+
+    workdir = tempfile.mkdtemp(prefix="ml-search-")
+    try:
+        x_path = os.path.join(workdir, "X.npy")
+        y_path = os.path.join(workdir, "y.npy")
+        np.save(x_path, np.ascontiguousarray(X))
+        np.save(y_path, y)
+
+        with ProcessPoolExecutor(
+            max_workers=min(workers, len(trials)),
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_load_fold_data,
+            initargs=(x_path, y_path, n_folds, is_classifier(estimator)),
+        ) as pool:
+            alive = trials
+            for fold, count in enumerate(schedule):
+                alive = sorted(alive, key=lambda t: (-t.mean_score, t.index))
+                for trial in alive[count:]:
+                    trial.pruned = True
+                alive = alive[:count]
+
+                futures = {pool.submit(_evaluate, estimator, trial.params, fold): trial for trial in alive}
+                for future in as_completed(futures):
+                    trial = futures[future]
+                    score, seconds = future.result()
+                    trial.scores.append(score)
+                    trial.seconds += seconds
+                    done += 1
+                    if on_progress is not None:
+                        on_progress(done / total)
+                logger.info(f"Search fold {fold + 1}/{n_folds}: {len(alive)} trials, "
+                            f"best mean score {max(t.mean_score for t in alive):.4f}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    best = max(alive, key=lambda t: (t.mean_score, -t.index))
+    return best, trials
+
+
+def register_search_result(name: str, model, metrics: Dict, params: Dict,
+                           tracking_uri: str = SEARCH_TRACKING_URI) -> Dict:
+    """
+    Log a search's metrics and winning model to MLflow and register the
+    model as rwa-models-{name}. Returns the run id and registered version;
+    empty when MLflow is disabled, missing or unreachable, since tracking
+    must not fail a training job.
+    """
+    if not tracking_uri:
+        return {}
+    try:
+        from mlflow_setup import MODEL_REGISTRY_NAME, log_model_metrics, register_model, setup_mlflow
+
+        setup_mlflow(tracking_uri)
+        run_id = log_model_metrics(metrics, params={k: str(v) for k, v in params.items()}, model=model)
+        registered = register_model(model, f"{MODEL_REGISTRY_NAME}-{name}", run_id)
+        return {
+            "mlflow_run_id": run_id,
+            "registered_version": registered.version if registered is not None else None,
+        }
+    except Exception as e:
+        logger.error(f"MLflow registration of {name} search failed: {str(e)}")
+        return {}
+
+
+# Example usage
+if __name__ == "__main__":
+    from sklearn.ensemble import RandomForestRegressor
+
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(20_000, 9))
+    y = X[:, 0] * 3 + np.sin(X[:, 1]) + rng.normal(scale=0.1, size=len(X))
+
+    estimator = RandomForestRegressor(random_state=42)
+    started = time.perf_counter()
+    best, trials = run_search(estimator, X, y)
+    elapsed = time.perf_counter() - started
+    fits = sum(len(t.scores) for t in trials)
+    print(f"{len(trials)} trials x {SEARCH_FOLDS} folds: {fits} fits instead of "
+          f"{len(trials) * SEARCH_FOLDS} in {elapsed:.1f}s on {SEARCH_WORKERS} workers")
+    print(f"Best: {best.params} mean R^2 {best.mean_score:.4f}")
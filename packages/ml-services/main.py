@@ -3,23 +3,102 @@ RWA DeFi Platform - ML Services
 Main FastAPI application for AI/ML services
 """
 
-from fastapi import FastAPI, HTTPException
+import time
+
+# Reported as import_seconds in the boot report; profile with `python -X importtime -c "import main"`
+IMPORT_STARTED = time.perf_counter()
+
+from fastapi import FastAPI, Header, HTTPException, Request, Response
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import List, Optional, Dict
 import uvicorn
 import numpy as np
 from datetime import datetime
-import joblib
+import asyncio
+import json
+import logging
 import os
-from sklearn.ensemble import RandomForestRegressor, GradientBoostingClassifier
-from sklearn.preprocessing import StandardScaler
+from admission import AdmissionMiddleware, admission_from_env
+from batching import batcher_from_env
+from executor import ExecutorSaturated, ExecutorTimeout, executor_from_env
+from hyperparameter_search import SEARCH_TRIALS
+from maintenance_engine import evaluate_maintenance_batch, extract_maintenance_features_batch, top_k
+from metrics import (
+    INFERENCE_LATENCY, QUEUE_WAIT, REQUEST_ITEMS, MetricsMiddleware, TimedRoute,
+    monitor_loop_lag, register_collector, render_metrics, timed_call
+)
+from model_registry import (
+    COMPILED_MAX_ROWS, INFERENCE_BACKEND, SERVING_PRECISION, ModelLeaseMiddleware, ModelRegistry, bundle_contributions,
+    bundle_predict_intervals, load_bundle, new_version
+)
+from model_watcher import watcher_from_env
+from model_store import FlatEnsemble, fresh_estimator, memory_usage, supports_intervals
+from portfolio_index import PortfolioIndex, PropertyValuation
+from prediction_cache import cache_from_env, canonical_hash, row_hash
+from streaming import NDJSONStreamResponse, parse_lines
+from stress_testing import MAX_PATHS, STRESS_PATHS, StressTestJobManager, scenario_params
+from response_encoding import (
+    ARROW_MEDIA_TYPE, BATCH_MEDIA_TYPES, FastJSONResponse, arrow_ipc, encode, lookup, masked, negotiate
+)
+from risk_engine import (
+    DEFAULT_PROBABILITY_VALUES, FACTOR_TABLE, RECOMMENDATION_TABLE, RISK_FEATURE_DEFAULTS, RISK_FEATURES,
+    RISK_LEVEL_NAMES, SUGGESTED_LTV_VALUES, extract_risk_features_batch, score_risk_batch
+)
+from risk_index import risk_index_from_env
+from risk_sensitivity import (
+    MAX_GRID_CELLS, MAX_SCENARIOS, GridTooLarge, base_result, grid_axes, sensitivity_grid, sensitivity_summary
+)
+from training_data import TableSource, TrainingDataError, discard, new_upload_path, resolve_data_path
+from training_jobs import TrainingConflict, TrainingJobManager
+
+logger = logging.getLogger(__name__)
+
+AVM_MODEL_VERSION = "v2.3.1"
+RISK_MODEL_VERSION = "v1.5.0"
+
+# Upper bound on records accepted by a single batch request
+MAX_BATCH_SIZE = int(os.getenv("ML_MAX_BATCH_SIZE", "50000"))
+
+# Upper bound on SPVs in a single stress test
+MAX_STRESS_SPVS = int(os.getenv("ML_STRESS_MAX_SPVS", "50000"))
+
+# Trees appended by an incremental training job, and the most a random forest keeps (0: no limit)
+INCREMENTAL_TREES = int(os.getenv("ML_INCREMENTAL_TREES", "10"))
+INCREMENTAL_MAX_TREES = int(os.getenv("ML_INCREMENTAL_MAX_TREES", "500"))
+
+# Largest Parquet / Arrow IPC body accepted by /api/v1/models/train_upload
+MAX_UPLOAD_BYTES = int(os.getenv("ML_TRAINING_MAX_UPLOAD_BYTES", str(2 * 1024 ** 3)))
+
+# Quantiles of the per-tree AVM outputs reported as lower_ci / upper_ci
+AVM_INTERVAL_QUANTILES = tuple(
+    float(q) for q in os.getenv("ML_AVM_INTERVAL_QUANTILES", "0.05,0.95").split(",")
+)
+if len(AVM_INTERVAL_QUANTILES) != 2 or not 0.0 <= AVM_INTERVAL_QUANTILES[0] < AVM_INTERVAL_QUANTILES[1] <= 1.0:
+    raise ValueError(f"Invalid ML_AVM_INTERVAL_QUANTILES: {AVM_INTERVAL_QUANTILES}")
+
+# Relative interval used when no per-tree outputs are available (heuristic valuations)
+FALLBACK_INTERVAL_MARGIN = 0.08
 
 app = FastAPI(
     title="RWA DeFi ML Services",
     description="AI/ML services for RWA DeFi Platform",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=FastJSONResponse
 )
+app.router.route_class = TimedRoute
+
+# Load shedding: per-client rate limits and a latency-driven concurrency limit
+# shared by priority class. Added first so rejections still get CORS headers
+# and are counted in the request metrics.
+admission = admission_from_env()
+if admission is not None:
+    app.add_middleware(
+        AdmissionMiddleware,
+        controller=admission,
+        client_header=os.getenv("ML_CLIENT_ID_HEADER", "x-client-id")
+    )
 
 # CORS middleware
 app.add_middleware(
@@ -30,11 +109,15 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request latency, phase and in-flight metrics for /metrics
+app.add_middleware(MetricsMiddleware)
+
 # Models
 class ValuationRequest(BaseModel):
     spv_id: str
     property_data: dict
     date: Optional[str] = None
+    explain: bool = False  # include per-feature attributions
 
 class ValuationResponse(BaseModel):
     value: float
@@ -43,6 +126,38 @@ class ValuationResponse(BaseModel):
     confidence: float
     model_version: str
     contributions: List[dict]
+    base_value: Optional[float] = None
+
+class BatchValuationRequest(BaseModel):
+    items: List[ValuationRequest]
+    explain: bool = False  # explain every item, not just those with explain set
+
+class BatchValuationItem(BaseModel):
+    index: int
+    spv_id: str
+    value: Optional[float] = None
+    lower_ci: Optional[float] = None
+    upper_ci: Optional[float] = None
+    confidence: Optional[float] = None
+    base_value: Optional[float] = None
+    contributions: Optional[List[dict]] = None
+    error: Optional[str] = None
+
+class BatchValuationResponse(BaseModel):
+    model_version: str
+    count: int
+    failed: int
+    results: List[BatchValuationItem]
+
+class PortfolioProperty(BaseModel):
+    property_id: str
+    property_data: dict
+
+class PortfolioRequest(BaseModel):
+    properties: List[PortfolioProperty]
+
+class PropertyUpdateRequest(BaseModel):
+    property_data: dict
 
 class RiskScoreRequest(BaseModel):
     spv_id: str
@@ -56,101 +171,408 @@ class RiskScoreResponse(BaseModel):
     factors: List[dict]
     recommendations: List[str]
 
-# Global model storage
-models = {
-    "avm": None,
-    "risk": None,
-    "scaler_avm": None,
-    "scaler_risk": None
+class BatchRiskScoreRequest(BaseModel):
+    items: List[RiskScoreRequest]
+
+class BatchRiskScoreItem(BaseModel):
+    index: int
+    spv_id: str
+    result: Optional[RiskScoreResponse] = None
+    error: Optional[str] = None
+
+class BatchRiskScoreResponse(BaseModel):
+    model_version: str
+    count: int
+    failed: int
+    results: List[BatchRiskScoreItem]
+
+class SensitivityRange(BaseModel):
+    values: Optional[List[float]] = None  # explicit values, or
+    start: Optional[float] = None  # evenly spaced from start to stop inclusive
+    stop: Optional[float] = None
+    steps: Optional[int] = None  # default 11
+
+class RiskSensitivityRequest(BaseModel):
+    spv_id: Optional[str] = None
+    features: dict = {}  # base features; missing ones take the scoring defaults
+    ranges: Dict[str, SensitivityRange]  # varied features, in grid axis order
+    output: str = "summary"  # "summary" (marginals and contour) or "grid" (every scenario)
+    contour: Optional[List[str]] = None  # two varied features; default the first two
+
+class RiskFeaturesUpdate(BaseModel):
+    features: dict
+    updated_at: Optional[datetime] = None  # when the features were observed (default now)
+
+class StressTestSPV(BaseModel):
+    spv_id: str
+    features: dict = {}  # risk features; missing ones take the scoring defaults
+    loan_to_value: Optional[float] = None  # default: suggested LTV of the current risk level
+    exposure: Optional[float] = None  # weight in portfolio losses, e.g. loan balance (default 1)
+
+class StressTestRequest(BaseModel):
+    spvs: List[StressTestSPV]
+    paths: Optional[int] = None  # simulated scenarios per SPV
+    seed: int = 42
+    scenario: Dict[str, float] = {}  # overrides of the default shock model
+
+class MaintenanceProperty(BaseModel):
+    property_id: str
+    spv_id: Optional[str] = None
+    data: dict = {}
+
+class MaintenanceScheduleRequest(BaseModel):
+    properties: List[MaintenanceProperty]
+    top_k: int = 100
+    budget: Optional[float] = None  # total estimated cost the schedule may spend
+    spv_ids: Optional[List[str]] = None  # only schedule properties of these SPVs
+
+# Active model + scaler bundles, swapped atomically on retraining and hot reload
+registry = ModelRegistry()
+
+# Each request keeps the bundles it first used until its response completes
+app.add_middleware(ModelLeaseMiddleware, registry=registry)
+
+MODEL_PATH = "/app/models"
+
+# CPU-bound work runs on bounded pools so the event loop stays responsive
+executors = {
+    "inference": executor_from_env("inference", "ML_INFERENCE", max_queue=256, timeout=10.0),
+    "training": executor_from_env("training", "ML_TRAINING", kind="process", max_workers=1, max_queue=4, timeout=3600.0),
+    # Coordinates stress tests; each running job fans out to its own process pool
+    "stress": executor_from_env("stress", "ML_STRESS_JOBS", max_workers=1, max_queue=4, timeout=3600.0)
 }
 
-def initialize_models():
-    """Initialize or load ML models"""
-    model_path = "/app/models"
-    os.makedirs(model_path, exist_ok=True)
+# Repeated identical single predictions are answered from memory
+prediction_cache = cache_from_env("ML_PREDICTION_CACHE")
+
+# Per-SPV valuation aggregates served by GET /api/v1/avm/{spv_id}
+portfolio_index = PortfolioIndex()
+
+# Precomputed risk scores per SPV served by GET /api/v1/risk/{spv_id}
+risk_index = risk_index_from_env()
+
+# Feature attributions per (model version, feature row)
+attribution_cache = cache_from_env("ML_ATTRIBUTION_CACHE", ttl_seconds=3600.0)
+
+def publish_bundle(bundle):
+    """Make a bundle active and drop cached results of the model it replaces"""
+    previous = registry.publish(bundle)
+    prediction_cache.invalidate(bundle.name)
+    attribution_cache.invalidate(bundle.name)
+    return previous
+
+training_jobs = TrainingJobManager(executors["training"], MODEL_PATH, publish_bundle)
+
+# Monte Carlo stress tests and their results, served by /api/v1/risk/stress_test
+stress_jobs = StressTestJobManager(executors["stress"])
+
+# Startup time and memory, filled in by the startup hook
+boot_report = {}
+
+# Background tasks started on startup and cancelled on shutdown
+background_tasks = []
+
+# Set by the background model loader; /ready answers 200 once models are loaded and warmed
+readiness = {"models_loaded": False, "warmed": False, "error": None}
+
+# Rows in the dummy batch used to warm the inference path before reporting ready
+WARMUP_BATCH_SIZE = 64
+
+async def run_in_executor(name: str, fn, *args):
+    """Run fn(*args) on the named executor, mapping saturation and timeouts to HTTP errors"""
+    started = time.perf_counter()
+    try:
+        result, seconds = await executors[name].run(timed_call, fn, *args)
+        INFERENCE_LATENCY.labels(name, fn.__name__).observe(seconds)
+        QUEUE_WAIT.labels(name).observe(max(0.0, time.perf_counter() - started - seconds))
+        return result
+    except ExecutorSaturated:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Service busy: {name} queue is full",
+            headers={"Retry-After": "1"}
+        )
+    except ExecutorTimeout:
+        raise HTTPException(status_code=504, detail=f"{name.capitalize()} timed out")
+
+def active_bundle(name: str):
+    """
+    The bundle of a model used by the current request, or 503 while models
+    are still loading. The first call leases the active bundle, so later
+    calls in the same request get the same version even across a reload.
+    """
+    bundle = registry.lease(name)
+    if bundle is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Models are loading",
+            headers={"Retry-After": "5"}
+        )
+    return bundle
+
+def read_bundle(name: str):
+    """Load a model's persisted bundle from MODEL_PATH, or a fresh unfitted one"""
+    # sklearn is imported here, off the import path, so the server can answer /live while it loads
+    from sklearn.ensemble import RandomForestRegressor, GradientBoostingClassifier
+    from sklearn.preprocessing import StandardScaler
     
-    # Initialize AVM model
-    avm_path = f"{model_path}/avm_model.pkl"
-    if os.path.exists(avm_path):
-        models["avm"] = joblib.load(avm_path)
+    if name == "avm":
+        model_factory = lambda: RandomForestRegressor(n_estimators=100, random_state=42)
+        default_version = AVM_MODEL_VERSION
     else:
-        models["avm"] = RandomForestRegressor(n_estimators=100, random_state=42)
-    
-    # Initialize Risk model
-    risk_path = f"{model_path}/risk_model.pkl"
-    if os.path.exists(risk_path):
-        models["risk"] = joblib.load(risk_path)
+        model_factory = lambda: GradientBoostingClassifier(n_estimators=100, random_state=42)
+        default_version = RISK_MODEL_VERSION
+    return load_bundle(MODEL_PATH, name, model_factory, StandardScaler, default_version)
+
+def initialize_models():
+    """Initialize or load ML models"""
+    os.makedirs(MODEL_PATH, exist_ok=True)
+    for name in ("avm", "risk"):
+        publish_bundle(read_bundle(name))
+
+def warm_bundle(bundle):
+    """Run a dummy batch through a bundle's serving path so first requests skip one-off setup costs"""
+    if bundle.name == "avm":
+        rng = np.random.default_rng(0)
+        features = rng.uniform(0.0, 1.0, size=(WARMUP_BATCH_SIZE, len(AVM_FEATURES)))
+        try:
+            bundle_predict_intervals(bundle, features, AVM_INTERVAL_QUANTILES)
+        except Exception:
+            # Unfitted models are served by the heuristic
+            calculate_heuristic_valuation_batch(features)
     else:
-        models["risk"] = GradientBoostingClassifier(n_estimators=100, random_state=42)
+        score_risk_records([dict(RISK_FEATURE_DEFAULTS)] * WARMUP_BATCH_SIZE)
+
+def warm_models():
+    """Warm every active bundle"""
+    for name in ("avm", "risk"):
+        warm_bundle(registry.get(name))
+
+async def reload_model(name: str) -> Optional[str]:
+    """
+    Load a model's bundle from disk off the event loop, warm it and publish
+    it. Requests already holding the previous bundle finish on it; returns
+    the new version, or None if that version is already active.
+    """
+    bundle = await asyncio.get_running_loop().run_in_executor(None, read_bundle, name)
+    current = registry.get(name)
+    if current is not None and current.version == bundle.version:
+        return None
+    await run_in_executor("inference", warm_bundle, bundle)
+    publish_bundle(bundle)
+    return bundle.version
+
+# Picks up bundles written to MODEL_PATH by other workers or deploys
+model_watcher = watcher_from_env(MODEL_PATH, ("avm", "risk"), reload_model)
+
+async def load_models():
+    """Load and warm models in the background, then mark the service ready"""
+    memory_before = memory_usage()
+    started = time.perf_counter()
+    # Manifests written while the initial load runs are picked up by the first poll
+    model_watcher.snapshot()
+    try:
+        await asyncio.get_running_loop().run_in_executor(None, initialize_models)
+        readiness["models_loaded"] = True
+        loaded = time.perf_counter()
+        await run_in_executor("inference", warm_models)
+        readiness["warmed"] = True
+    except Exception as e:
+        readiness["error"] = str(e)
+        logger.error(f"Model loading failed: {str(e)}")
+        return
     
-    # Initialize scalers
-    models["scaler_avm"] = StandardScaler()
-    models["scaler_risk"] = StandardScaler()
+    mapped_bytes = sum(
+        bundle.model.nbytes
+        for bundle in (registry.get("avm"), registry.get("risk"))
+        if isinstance(bundle.model, FlatEnsemble)
+    )
+    boot_report.update({
+        "model_load_seconds": loaded - started,
+        "warmup_seconds": time.perf_counter() - loaded,
+        "ready_seconds": time.perf_counter() - IMPORT_STARTED,
+        "memory_before": memory_before,
+        "memory_after": memory_usage(),
+        "memory_mapped_model_bytes": mapped_bytes
+    })
+    logger.info(
+        f"Models loaded in {boot_report['model_load_seconds']:.3f}s; "
+        f"RSS {boot_report['memory_after'].get('VmRSS', 0) / 2**20:.1f} MiB "
+        f"(anon {boot_report['memory_after'].get('RssAnon', 0) / 2**20:.1f} MiB, "
+        f"file-backed {boot_report['memory_after'].get('RssFile', 0) / 2**20:.1f} MiB); "
+        f"{mapped_bytes / 2**20:.1f} MiB of model arrays memory-mapped; "
+        f"ready {boot_report['ready_seconds']:.3f}s after import"
+    )
+    if model_watcher.enabled:
+        background_tasks.append(asyncio.ensure_future(model_watcher.run()))
 
 @app.on_event("startup")
 async def startup_event():
-    """Initialize models on startup"""
-    initialize_models()
+    """Start background tasks; models load without blocking /live"""
+    background_tasks.append(asyncio.ensure_future(monitor_loop_lag()))
+    background_tasks.append(asyncio.ensure_future(load_models()))
+    if risk_index.enabled:
+        background_tasks.append(asyncio.ensure_future(risk_index.run()))
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background tasks and executor pools"""
+    for task in background_tasks:
+        task.cancel()
+    background_tasks.clear()
+    for executor in executors.values():
+        executor.shutdown(wait=False)
+    training_jobs.shutdown()
 
 # Health check
+@app.get("/live")
+async def liveness():
+    """Liveness probe: the process is up and its event loop is responsive"""
+    return {"status": "alive"}
+
+@app.get("/ready")
+async def readiness_check():
+    """Readiness probe: models are loaded and warmed"""
+    ready = readiness["models_loaded"] and readiness["warmed"]
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "status": "ready" if ready else "not_ready",
+            **readiness,
+            "models": registry.versions()
+        }
+    )
+
 @app.get("/health")
 async def health_check():
     return {
         "status": "healthy",
         "service": "ml-services",
+        "ready": readiness["models_loaded"] and readiness["warmed"],
         "models_loaded": {
-            "avm": models["avm"] is not None,
-            "risk": models["risk"] is not None
-        }
+            "avm": registry.get("avm") is not None,
+            "risk": registry.get("risk") is not None
+        },
+        "executors": {name: executor.stats() for name, executor in executors.items()},
+        "batching": {"avm": avm_batcher.stats()},
+        "cache": {"predictions": prediction_cache.stats(), "attributions": attribution_cache.stats()},
+        "portfolios": portfolio_index.stats(),
+        "risk_index": risk_index.stats(),
+        "hot_reload": {**model_watcher.stats(), "leases": registry.lease_stats()},
+        "admission": admission.stats() if admission is not None else {"enabled": False},
+        "boot": {"import_seconds": IMPORT_SECONDS, **boot_report},
+        "memory": memory_usage()
     }
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics"""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
 # AVM Endpoints
+def valuation_intervals(predictions: np.ndarray, lower: Optional[np.ndarray], upper: Optional[np.ndarray]):
+    """Return (lower, upper), falling back to a fixed margin when the model gave no bounds"""
+    if lower is None or upper is None:
+        margins = predictions * FALLBACK_INTERVAL_MARGIN
+        return predictions - margins, predictions + margins
+    return lower, upper
+
+async def predict_avm_rows(features: np.ndarray, bundle) -> list:
+    """
+    Batched AVM prediction used by the request coalescer; yields (value,
+    lower, upper, version) per row. bundle is the one the requests leased,
+    so rows submitted across a hot swap are predicted by their own version.
+    """
+    predictions, lower, upper = await run_in_executor(
+        "inference", bundle_predict_intervals, bundle, features, AVM_INTERVAL_QUANTILES
+    )
+    lower, upper = valuation_intervals(predictions, lower, upper)
+    return [
+        (float(value), float(low), float(high), bundle.version)
+        for value, low, high in zip(predictions, lower, upper)
+    ]
+
+# Concurrent single-property predictions are coalesced into one predict call
+avm_batcher = batcher_from_env("avm", "ML_AVM_BATCH", predict_avm_rows)
+
+register_collector(
+    executors, {"avm": avm_batcher}, {"predictions": prediction_cache, "attributions": attribution_cache}
+)
+
 @app.post("/api/v1/avm/predict", response_model=ValuationResponse)
 async def predict_valuation(request: ValuationRequest):
     """
     Predict property valuation using AVM model
     """
     try:
+        bundle = active_bundle("avm")
+        digest = canonical_hash([request.property_data, request.explain])
+        cached = prediction_cache.get("avm", bundle.version, digest)
+        if cached is not None:
+            return cached
+        
         # Extract features from property data
         features = extract_avm_features(request.property_data)
+        model_version = bundle.version
+        lower_ci = upper_ci = None
+        base_value, contributions = None, []
         
         # Use model if trained, otherwise use heuristic
-        if models["avm"] is not None and hasattr(models["avm"], "predict"):
+        if bundle.model is not None and hasattr(bundle.model, "predict"):
             try:
-                prediction = float(models["avm"].predict(features)[0])
+                row = np.asarray(features[0], dtype=np.float64)
+                if not np.isfinite(row).all():
+                    raise ValueError("Non-finite AVM features")
+                prediction, lower_ci, upper_ci, model_version = await avm_batcher.submit(row, bundle)
                 confidence = 0.92
-            except:
+                if request.explain:
+                    explanation = (await run_in_executor("inference", explain_valuations, bundle, row[None, :]))[0]
+                    if explanation is not None:
+                        base_value, contributions = explanation
+            except HTTPException:
+                raise
+            except Exception:
                 prediction = calculate_heuristic_valuation(request.property_data)
                 confidence = 0.75
         else:
             prediction = calculate_heuristic_valuation(request.property_data)
             confidence = 0.75
         
-        # Calculate confidence intervals
-        margin = prediction * 0.08
+        # Heuristic valuations have no tree spread; use a fixed margin
+        if lower_ci is None:
+            margin = prediction * FALLBACK_INTERVAL_MARGIN
+            lower_ci, upper_ci = prediction - margin, prediction + margin
         
-        return ValuationResponse(
+        response = ValuationResponse(
             value=prediction,
-            lower_ci=prediction - margin,
-            upper_ci=prediction + margin,
+            lower_ci=lower_ci,
+            upper_ci=upper_ci,
             confidence=confidence,
-            model_version="v2.3.1",
-            contributions=[
-                {"feature": "location", "impact": 0.35},
-                {"feature": "rent_income", "impact": 0.28},
-                {"feature": "occupancy", "impact": 0.15},
-                {"feature": "market_conditions", "impact": 0.22}
-            ]
+            model_version=model_version,
+            contributions=contributions,
+            base_value=base_value
         )
+        prediction_cache.put("avm", model_version, digest, response)
+        return response
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Valuation error: {str(e)}")
 
-def extract_avm_features(property_data: dict) -> np.ndarray:
-    """Extract features for AVM model"""
-    features = [
+# Column order of the AVM feature matrix
+AVM_FEATURES = [
+    "area", "lat", "lon", "monthly_rent", "occupancy_rate",
+    "purchase_price", "market_avg_price", "market_growth", "is_commercial"
+]
+
+def _avm_feature_row(property_data: dict) -> list:
+    """Raw AVM feature values for one property, in AVM_FEATURES order"""
+    location = property_data.get("location", {})
+    return [
         property_data.get("area", 1000),
-        property_data.get("location", {}).get("lat", 0),
-        property_data.get("location", {}).get("lon", 0),
+        location.get("lat", 0),
+        location.get("lon", 0),
         property_data.get("monthly_rent", 10000),
         property_data.get("occupancy_rate", 0.85),
         property_data.get("purchase_price", 1000000),
@@ -158,7 +580,43 @@ def extract_avm_features(property_data: dict) -> np.ndarray:
         property_data.get("market_growth", 0.05),
         1 if property_data.get("type") == "COMMERCIAL" else 0
     ]
-    return np.array(features).reshape(1, -1)
+
+def extract_avm_features(property_data: dict) -> np.ndarray:
+    """Extract features for AVM model"""
+    return np.array(_avm_feature_row(property_data)).reshape(1, -1)
+
+def extract_avm_features_batch(records: List[dict]):
+    """
+    Extract AVM features for many properties into one contiguous float64 matrix.
+    Returns (features, errors) where errors[i] is None for valid rows; invalid
+    rows, including those with null, NaN or infinite values (which the single
+    endpoint does not send to the model either), are reported in errors and
+    left in place so row indices stay aligned with the input.
+    """
+    errors: List[Optional[str]] = [None] * len(records)
+    rows = []
+    for i, property_data in enumerate(records):
+        try:
+            rows.append(_avm_feature_row(property_data))
+        except Exception as e:
+            errors[i] = f"Invalid property_data: {e}"
+            rows.append([np.nan] * len(AVM_FEATURES))
+    
+    try:
+        features = np.array(rows, dtype=np.float64).reshape(len(rows), len(AVM_FEATURES))
+    except (TypeError, ValueError, OverflowError):
+        # Slow path: isolate the rows that hold non-numeric or out-of-range values
+        features = np.full((len(rows), len(AVM_FEATURES)), np.nan)
+        for i, row in enumerate(rows):
+            try:
+                features[i] = np.array(row, dtype=np.float64)
+            except (TypeError, ValueError, OverflowError) as e:
+                errors[i] = f"Invalid property_data: {e}"
+    
+    for i in np.flatnonzero(~np.isfinite(features).all(axis=1)).tolist():
+        if errors[i] is None:
+            errors[i] = "Invalid property_data: values must be finite numbers"
+    return features, errors
 
 def calculate_heuristic_valuation(property_data: dict) -> float:
     """Calculate valuation using heuristic approach"""
@@ -174,44 +632,357 @@ def calculate_heuristic_valuation(property_data: dict) -> float:
     
     return base_value * location_factor * type_factor * occupancy_factor * market_factor
 
+def calculate_heuristic_valuation_batch(features: np.ndarray) -> np.ndarray:
+    """Vectorized heuristic valuation over an AVM feature matrix"""
+    area = features[:, 0]
+    lat = features[:, 1]
+    occupancy = features[:, 4]
+    market_avg = features[:, 6]
+    market_growth = features[:, 7]
+    
+    base_value = area * market_avg
+    location_factor = 1.0 + (lat * 0.01)
+    type_factor = np.where(features[:, 8] == 1, 1.2, 1.0)
+    occupancy_factor = 1.0 + ((occupancy - 0.85) * 0.5)
+    market_factor = 1.0 + market_growth
+    
+    return base_value * location_factor * type_factor * occupancy_factor * market_factor
+
+def explain_valuations(bundle, features: np.ndarray) -> list:
+    """
+    Tree-path attributions for each feature row as (base_value, contributions),
+    or None per row if the model has none. Rows already explained under the
+    bundle's version come from the attribution cache; the rest are attributed
+    in one pass.
+    """
+    explanations = [None] * len(features)
+    if not supports_intervals(bundle.model):
+        return explanations
+    
+    digests = [row_hash(row) for row in features]
+    missing = []
+    for i, digest in enumerate(digests):
+        explanations[i] = attribution_cache.get("avm", bundle.version, digest)
+        if explanations[i] is None:
+            missing.append(i)
+    
+    if missing:
+        bias, contributions = bundle_contributions(bundle, features[missing])
+        for j, i in enumerate(missing):
+            order = np.argsort(-np.abs(contributions[j]), kind="stable")
+            explanations[i] = (
+                float(bias[j]),
+                [{"feature": AVM_FEATURES[k], "impact": float(contributions[j, k])} for k in order]
+            )
+            attribution_cache.put("avm", bundle.version, digests[i], explanations[i])
+    return explanations
+
+def value_properties_batch(bundle, records: List[dict], explain: Optional[np.ndarray] = None):
+    """
+    Value many properties with one predict call.
+    Returns (predictions, lower, upper, confidence, errors, explanations);
+    invalid rows are NaN and explanations are filled in only where explain is set.
+    """
+    features, errors = extract_avm_features_batch(records)
+    explanations = [None] * len(errors)
+    valid = np.array([e is None for e in errors], dtype=bool)
+    predictions = np.full(len(errors), np.nan)
+    lower = np.full(len(errors), np.nan)
+    upper = np.full(len(errors), np.nan)
+    
+    # Use model if trained, otherwise use heuristic
+    confidence = 0.75
+    if valid.any():
+        X = features[valid]
+        bounds = (None, None)
+        if bundle.model is not None and hasattr(bundle.model, "predict"):
+            try:
+                predictions[valid], *bounds = bundle_predict_intervals(bundle, X, AVM_INTERVAL_QUANTILES)
+                confidence = 0.92
+                if explain is not None and (explain & valid).any():
+                    rows = np.flatnonzero(explain & valid)
+                    for i, explanation in zip(rows, explain_valuations(bundle, features[rows])):
+                        explanations[i] = explanation
+            except Exception:
+                predictions[valid] = calculate_heuristic_valuation_batch(X)
+        else:
+            predictions[valid] = calculate_heuristic_valuation_batch(X)
+        lower[valid], upper[valid] = valuation_intervals(predictions[valid], *bounds)
+    return predictions, lower, upper, confidence, errors, explanations
+
+def batch_media_type(accept: Optional[str]) -> str:
+    """Encoding of a batch response from the Accept header, or 406"""
+    media_type = negotiate(accept, BATCH_MEDIA_TYPES)
+    if media_type is None:
+        raise HTTPException(
+            status_code=406,
+            detail=f"Batch results are available as {', '.join(BATCH_MEDIA_TYPES)}"
+        )
+    return media_type
+
+# Batch responses in every negotiable encoding, for the OpenAPI schema
+BATCH_RESPONSES = {200: {"content": {media_type: {} for media_type in BATCH_MEDIA_TYPES[1:]}}}
+
+def valuation_batch_body(bundle, records: List[dict], spv_ids: List[str], explain: np.ndarray,
+                         media_type: str) -> bytes:
+    """
+    Value a batch and encode the BatchValuationResponse body directly. The
+    JSON and MessagePack bodies are built from plain dicts; the Arrow IPC
+    body is one row per item, with columns taken straight from the
+    prediction arrays (nulls where an item failed) and model_version,
+    count and failed in the schema metadata.
+    """
+    predictions, lower, upper, confidence, errors, explanations = value_properties_batch(
+        bundle, records, explain
+    )
+    for i in np.flatnonzero(~np.isfinite(predictions)).tolist():
+        if errors[i] is None:
+            errors[i] = "Valuation is not finite"
+    valid = np.array([e is None for e in errors], dtype=bool)
+    failed = len(errors) - int(valid.sum())
+    
+    if media_type == ARROW_MEDIA_TYPE:
+        columns = {
+            "index": np.arange(len(records), dtype=np.int64),
+            "spv_id": spv_ids,
+            "value": masked(predictions, valid),
+            "lower_ci": masked(lower, valid),
+            "upper_ci": masked(upper, valid),
+            "confidence": masked(np.full(len(records), confidence), valid),
+            "error": errors,
+        }
+        if explain.any():
+            columns["base_value"] = [e[0] if e else None for e in explanations]
+            columns["contributions"] = [e[1] if e else None for e in explanations]
+        return arrow_ipc(columns, {
+            "model_version": bundle.version, "count": str(len(records)), "failed": str(failed)
+        })
+    
+    results = []
+    for i, (spv_id, value, low, high) in enumerate(
+        zip(spv_ids, predictions.tolist(), lower.tolist(), upper.tolist())
+    ):
+        if errors[i] is not None:
+            results.append({
+                "index": i, "spv_id": spv_id, "value": None, "lower_ci": None, "upper_ci": None,
+                "confidence": None, "base_value": None, "contributions": None, "error": errors[i]
+            })
+            continue
+        explanation = explanations[i]
+        results.append({
+            "index": i,
+            "spv_id": spv_id,
+            "value": value,
+            "lower_ci": low,
+            "upper_ci": high,
+            "confidence": confidence,
+            "base_value": explanation[0] if explanation else None,
+            "contributions": explanation[1] if explanation else None,
+            "error": None
+        })
+    return encode({
+        "model_version": bundle.version,
+        "count": len(results),
+        "failed": failed,
+        "results": results
+    }, media_type)
+
+@app.post("/api/v1/avm/predict_batch", response_model=BatchValuationResponse, responses=BATCH_RESPONSES)
+async def predict_valuation_batch(request: BatchValuationRequest, accept: Optional[str] = Header(None)):
+    """
+    Predict valuations for many properties with a single model call.
+    Results are JSON by default, or MessagePack / Arrow IPC via Accept.
+    """
+    REQUEST_ITEMS.labels("/api/v1/avm/predict_batch").observe(len(request.items))
+    if len(request.items) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large: {len(request.items)} items (max {MAX_BATCH_SIZE})"
+        )
+    media_type = batch_media_type(accept)
+    
+    try:
+        bundle = active_bundle("avm")
+        explain = np.array([request.explain or item.explain for item in request.items], dtype=bool)
+        body = await run_in_executor(
+            "inference",
+            valuation_batch_body,
+            bundle,
+            [item.property_data for item in request.items],
+            [item.spv_id for item in request.items],
+            explain,
+            media_type
+        )
+        return Response(content=body, media_type=media_type)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Batch valuation error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Batch valuation error: {str(e)}")
+
+# SPV Portfolio Valuation
+def value_portfolio(bundle, properties: List[PortfolioProperty], revisions: List[int]):
+    """
+    Value an SPV's properties with one batch AVM call.
+    Returns (valuations, errors) with errors keyed by property id.
+    """
+    predictions, lower, upper, confidence, errors, _ = value_properties_batch(
+        bundle, [prop.property_data for prop in properties]
+    )
+    valuations, failed = [], {}
+    for i, prop in enumerate(properties):
+        if errors[i] is None and not np.isfinite(predictions[i]):
+            errors[i] = "Valuation is not finite"
+        if errors[i] is not None:
+            failed[prop.property_id] = errors[i]
+            continue
+        valuations.append(PropertyValuation(
+            property_id=prop.property_id,
+            property_data=prop.property_data,
+            value=float(predictions[i]),
+            lower_ci=float(lower[i]),
+            upper_ci=float(upper[i]),
+            confidence=confidence,
+            revision=revisions[i]
+        ))
+    return valuations, failed
+
+async def revalue_if_stale(spv_id: str):
+    """Revalue every property of an SPV in one batch if a newer AVM model was published"""
+    aggregate = portfolio_index.get(spv_id)
+    bundle = active_bundle("avm")
+    if aggregate is None or aggregate.model_version == bundle.version:
+        return aggregate
+    current = list(aggregate.properties.values())
+    valuations, failed = await run_in_executor(
+        "inference",
+        value_portfolio,
+        bundle,
+        [PortfolioProperty(property_id=v.property_id, property_data=v.property_data) for v in current],
+        [v.revision for v in current]
+    )
+    version = bundle.version
+    if failed:
+        # Keep the old version so the next read retries the whole portfolio
+        logger.error(f"Revaluing SPV {spv_id} under {bundle.version} failed for {len(failed)} properties")
+        version = aggregate.model_version
+    return portfolio_index.update(spv_id, valuations, version, revalued=True)
+
+def portfolio_response(aggregate, date: Optional[str] = None) -> dict:
+    return {
+        **aggregate.summary(),
+        "date": date or datetime.now().strftime("%Y-%m-%d")
+    }
+
 @app.get("/api/v1/avm/{spv_id}")
 async def get_valuation(spv_id: str, date: Optional[str] = None):
     """
-    Get valuation for a specific SPV
+    Get valuation for a specific SPV from its aggregated property valuations
     """
     try:
-        # Mock property data - replace with actual database query
-        properties = [
-            {
-                "id": 1,
-                "address": "123 Main St",
-                "location": "New York",
-                "size_sqft": 2000,
-                "bedrooms": 3,
-                "bathrooms": 2,
-                "year_built": 2010,
-                "property_type": "residential",
-                "rental_income": 3000,
-            }
-        ]
-        
-        total_value = 0
-        for prop in properties:
-            base_value = prop["size_sqft"] * 200
-            location_mult = 1.5 if prop["location"] == "New York" else 1.0
-            total_value += base_value * location_mult
-        
-        return {
-            "spv_id": spv_id,
-            "value": total_value,
-            "date": date or datetime.now().strftime("%Y-%m-%d"),
-            "confidence": 0.85,
-            "properties_count": len(properties)
-        }
+        aggregate = await revalue_if_stale(spv_id)
+        if aggregate is None:
+            raise HTTPException(status_code=404, detail=f"No properties registered for SPV {spv_id}")
+        return portfolio_response(aggregate, date)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Valuation error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.put("/api/v1/avm/{spv_id}/properties")
+async def set_portfolio(spv_id: str, request: PortfolioRequest):
+    """
+    Replace an SPV's properties and value them with one batch call
+    """
+    if len(request.properties) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Portfolio too large: {len(request.properties)} properties (max {MAX_BATCH_SIZE})"
+        )
+    ids = [prop.property_id for prop in request.properties]
+    if len(set(ids)) != len(ids):
+        raise HTTPException(status_code=400, detail="Duplicate property_id in portfolio")
+    
+    try:
+        bundle = active_bundle("avm")
+        revision = portfolio_index.next_revision()
+        valuations, failed = await run_in_executor(
+            "inference", value_portfolio, bundle, request.properties, [revision] * len(request.properties)
+        )
+        if failed:
+            raise HTTPException(status_code=400, detail={"message": "Invalid properties", "errors": failed})
+        aggregate = portfolio_index.replace(spv_id, valuations, bundle.version, revision)
+        return portfolio_response(aggregate)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Portfolio valuation error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Portfolio valuation error: {str(e)}")
+
+@app.put("/api/v1/avm/{spv_id}/properties/{property_id}")
+async def set_portfolio_property(spv_id: str, property_id: str, request: PropertyUpdateRequest):
+    """
+    Add or update one property; only that property is revalued
+    """
+    try:
+        aggregate = await revalue_if_stale(spv_id)
+        bundle = active_bundle("avm")
+        revision = portfolio_index.next_revision()
+        prop = PortfolioProperty(property_id=property_id, property_data=request.property_data)
+        valuations, failed = await run_in_executor("inference", value_portfolio, bundle, [prop], [revision])
+        if failed:
+            raise HTTPException(status_code=400, detail=failed[property_id])
+        aggregate = portfolio_index.update(spv_id, valuations, bundle.version)
+        valuation = valuations[0]
+        return {
+            **portfolio_response(aggregate),
+            "property": {
+                "property_id": property_id,
+                "value": valuation.value,
+                "lower_ci": valuation.lower_ci,
+                "upper_ci": valuation.upper_ci,
+                "confidence": valuation.confidence
+            }
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Property valuation error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Property valuation error: {str(e)}")
+
+@app.delete("/api/v1/avm/{spv_id}/properties/{property_id}")
+async def delete_portfolio_property(spv_id: str, property_id: str):
+    """
+    Remove one property from an SPV's valuation
+    """
+    if not portfolio_index.remove_property(spv_id, property_id):
+        raise HTTPException(status_code=404, detail="Property not found")
+    return portfolio_response(portfolio_index.get(spv_id))
+
+@app.get("/api/v1/avm/{spv_id}/properties")
+async def list_portfolio_properties(spv_id: str):
+    """
+    Per-property valuations of an SPV
+    """
+    aggregate = await revalue_if_stale(spv_id)
+    if aggregate is None:
+        raise HTTPException(status_code=404, detail=f"No properties registered for SPV {spv_id}")
+    return {
+        "spv_id": spv_id,
+        "model_version": aggregate.model_version,
+        "properties": [
+            {
+                "property_id": v.property_id,
+                "value": v.value,
+                "lower_ci": v.lower_ci,
+                "upper_ci": v.upper_ci,
+                "confidence": v.confidence
+            }
+            for v in list(aggregate.properties.values())
+        ]
+    }
+
 # Risk Scoring Endpoints
 @app.post("/api/v1/risk/score", response_model=RiskScoreResponse)
 async def calculate_risk_score(request: RiskScoreRequest):
@@ -220,6 +991,11 @@ async def calculate_risk_score(request: RiskScoreRequest):
     """
     try:
         features = request.features
+        risk_version = active_bundle("risk").version
+        digest = canonical_hash(features)
+        cached = prediction_cache.get("risk", risk_version, digest)
+        if cached is not None:
+            return cached
         
         # Calculate individual risk factors
         rent_delinquency = features.get("rent_delinquency_rate", 0.05)
@@ -271,7 +1047,7 @@ async def calculate_risk_score(request: RiskScoreRequest):
         if risk_score < 30:
             recommendations.append("Excellent risk profile - consider expansion")
         
-        return RiskScoreResponse(
+        response = RiskScoreResponse(
             risk_score=int(risk_score),
             risk_level=risk_level,
             default_probability=default_prob,
@@ -284,9 +1060,437 @@ async def calculate_risk_score(request: RiskScoreRequest):
             ],
             recommendations=recommendations
         )
+        prediction_cache.put("risk", risk_version, digest, response)
+        return response
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Risk scoring error: {str(e)}")
 
+def score_risk_records(features_list: List[dict]):
+    """Extract and score many SPV feature dicts; returns (results, errors)"""
+    X, errors = extract_risk_features_batch(features_list)
+    valid = np.array([e is None for e in errors], dtype=bool)
+    return score_risk_batch(X[valid]).to_dicts(), errors
+
+def risk_batch_body(features_list: List[dict], spv_ids: List[str], media_type: str) -> bytes:
+    """
+    Score a batch and encode the BatchRiskScoreResponse body directly. The
+    Arrow IPC body flattens each result into columns built from the score
+    arrays: risk_level is dictionary encoded, and factors and
+    recommendations are gathered from their precomputed tables by code.
+    """
+    X, errors = extract_risk_features_batch(features_list)
+    valid = np.array([e is None for e in errors], dtype=bool)
+    scores = score_risk_batch(X[valid])
+    failed = len(errors) - int(valid.sum())
+    
+    if media_type == ARROW_MEDIA_TYPE:
+        import pyarrow as pa
+        
+        def spread(values: np.ndarray) -> np.ndarray:
+            full = np.zeros(len(valid), dtype=values.dtype)
+            full[valid] = values
+            return full
+        
+        columns = {
+            "index": np.arange(len(valid), dtype=np.int64),
+            "spv_id": spv_ids,
+            "risk_score": masked(spread(scores.risk_scores), valid),
+            "risk_level": pa.DictionaryArray.from_arrays(
+                masked(spread(scores.levels.astype(np.int8)), valid), RISK_LEVEL_NAMES
+            ),
+            "default_probability": masked(spread(scores.default_probabilities), valid),
+            "suggested_ltv": masked(spread(scores.suggested_ltvs), valid),
+            "factors": lookup(FACTOR_TABLE, spread(scores.factor_codes), valid),
+            "recommendations": lookup(RECOMMENDATION_TABLE, spread(scores.recommendation_codes), valid),
+            "error": errors,
+        }
+        return arrow_ipc(columns, {
+            "model_version": RISK_MODEL_VERSION, "count": str(len(valid)), "failed": str(failed)
+        })
+    
+    scored = iter(scores.to_dicts())
+    results = []
+    for i, spv_id in enumerate(spv_ids):
+        if errors[i] is not None:
+            results.append({"index": i, "spv_id": spv_id, "result": None, "error": errors[i]})
+        else:
+            results.append({"index": i, "spv_id": spv_id, "result": next(scored), "error": None})
+    return encode({
+        "model_version": RISK_MODEL_VERSION,
+        "count": len(results),
+        "failed": failed,
+        "results": results
+    }, media_type)
+
+@app.post("/api/v1/risk/score_batch", response_model=BatchRiskScoreResponse, responses=BATCH_RESPONSES)
+async def calculate_risk_score_batch(request: BatchRiskScoreRequest, accept: Optional[str] = Header(None)):
+    """
+    Calculate risk scores for many SPVs in one vectorized pass.
+    Results are JSON by default, or MessagePack / Arrow IPC via Accept.
+    """
+    REQUEST_ITEMS.labels("/api/v1/risk/score_batch").observe(len(request.items))
+    if len(request.items) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large: {len(request.items)} items (max {MAX_BATCH_SIZE})"
+        )
+    media_type = batch_media_type(accept)
+    
+    try:
+        body = await run_in_executor(
+            "inference",
+            risk_batch_body,
+            [item.features for item in request.items],
+            [item.spv_id for item in request.items],
+            media_type
+        )
+        return Response(content=body, media_type=media_type)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Batch risk scoring error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Batch risk scoring error: {str(e)}")
+
+# What-if Sensitivity
+def risk_sensitivity_body(spv_id: Optional[str], names: List[str], axes: List[np.ndarray], fixed: Dict,
+                          output: str, contour: Optional[List[str]], media_type: str) -> bytes:
+    """
+    Evaluate a sensitivity grid and encode the response. Grid output holds
+    uint8 risk scores and level indices in C order over the axes (the last
+    feature varies fastest); levels map to names, LTVs and default
+    probabilities through the by_level tables. As Arrow IPC it is one
+    uint8 column of scores and one dictionary-encoded level column, with
+    the axes in the schema metadata.
+    """
+    head = {
+        "spv_id": spv_id,
+        "model_version": RISK_MODEL_VERSION,
+        "base": base_result(fixed),
+    }
+    if output == "summary":
+        return encode({**head, **sensitivity_summary(names, axes, fixed, tuple(contour) if contour else None)},
+                      media_type)
+    
+    scores, levels = sensitivity_grid(names, axes, fixed)
+    tables = {
+        "risk_level_names": RISK_LEVEL_NAMES,
+        "suggested_ltv_by_level": SUGGESTED_LTV_VALUES,
+        "default_probability_by_level": DEFAULT_PROBABILITY_VALUES,
+    }
+    if media_type == ARROW_MEDIA_TYPE:
+        import pyarrow as pa
+        
+        return arrow_ipc(
+            {
+                "risk_score": scores.ravel(),
+                "risk_level": pa.DictionaryArray.from_arrays(levels.ravel(), RISK_LEVEL_NAMES),
+            },
+            {
+                "model_version": RISK_MODEL_VERSION,
+                "axes": json.dumps({"names": names, "values": [axis.tolist() for axis in axes]}),
+                "base": json.dumps(head["base"]),
+                "suggested_ltv_by_level": json.dumps(SUGGESTED_LTV_VALUES),
+            }
+        )
+    return encode({
+        **head,
+        "scenarios": int(scores.size),
+        "shape": list(scores.shape),
+        "axes": {name: axis.tolist() for name, axis in zip(names, axes)},
+        **tables,
+        "risk_score": scores.ravel().tolist(),
+        "risk_level": levels.ravel().tolist(),
+    }, media_type)
+
+@app.post("/api/v1/risk/sensitivity", responses=BATCH_RESPONSES)
+async def risk_sensitivity(request: RiskSensitivityRequest, accept: Optional[str] = Header(None)):
+    """
+    How risk_score and suggested_ltv move over the Cartesian grid of the
+    given feature ranges, evaluated as one vectorized computation
+    """
+    if request.output not in ("summary", "grid"):
+        raise HTTPException(status_code=400, detail="output must be 'summary' or 'grid'")
+    if request.contour is not None and len(request.contour) != 2:
+        raise HTTPException(status_code=400, detail="contour must name two features")
+    limit = MAX_GRID_CELLS if request.output == "grid" else MAX_SCENARIOS
+    try:
+        # Sizes are checked against the limit before any axis is allocated
+        names, axes, fixed = grid_axes(
+            request.features, {name: r.model_dump() for name, r in request.ranges.items()}, limit
+        )
+    except GridTooLarge as e:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Grid too large: {e.scenarios} scenarios (max {limit} for {request.output} output)"
+        )
+    except (TypeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    media_type = batch_media_type(accept)
+    if media_type == ARROW_MEDIA_TYPE and request.output == "summary":
+        raise HTTPException(status_code=406, detail="Arrow IPC is only available for grid output")
+    
+    try:
+        body = await run_in_executor(
+            "inference", risk_sensitivity_body, request.spv_id, names, axes, fixed,
+            request.output, request.contour, media_type
+        )
+        return Response(content=body, media_type=media_type)
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Risk sensitivity error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Risk sensitivity error: {str(e)}")
+
+# Monte Carlo Stress Testing
+def stress_result_body(job, media_type: str) -> bytes:
+    """
+    Encode a finished stress test: the job, the portfolio loss and default
+    count distribution, and per-SPV statistics. As Arrow IPC the per-SPV
+    statistics are float64 columns (null for failed rows), with the job and
+    portfolio as JSON in the schema metadata.
+    """
+    result = job.result
+    head = {**job.to_dict(), "model_version": RISK_MODEL_VERSION, "portfolio": result.portfolio()}
+    if media_type == ARROW_MEDIA_TYPE:
+        valid = result.inputs.valid
+        ltv = np.zeros(len(valid))
+        ltv[valid] = result.inputs.loan_to_values
+        columns = {
+            "index": np.arange(len(valid), dtype=np.int64),
+            "spv_id": result.inputs.spv_ids,
+            **{name: masked(values, valid) for name, values in result.columns().items()},
+            "loan_to_value": masked(ltv, valid),
+            "error": result.inputs.errors,
+        }
+        return arrow_ipc(columns, {"job": json.dumps(head)})
+    return encode({**head, "results": result.to_dicts()}, media_type)
+
+@app.post("/api/v1/risk/stress_test", status_code=202)
+async def submit_stress_test(request: StressTestRequest):
+    """
+    Submit a Monte Carlo stress test of the given SPVs; poll status_url
+    for progress and results
+    """
+    REQUEST_ITEMS.labels("/api/v1/risk/stress_test").observe(len(request.spvs))
+    if len(request.spvs) > MAX_STRESS_SPVS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Too many SPVs: {len(request.spvs)} (max {MAX_STRESS_SPVS})"
+        )
+    paths = STRESS_PATHS if request.paths is None else request.paths
+    if paths < 1:
+        raise HTTPException(status_code=400, detail="paths must be positive")
+    if paths > MAX_PATHS:
+        raise HTTPException(status_code=413, detail=f"Too many paths: {paths} (max {MAX_PATHS})")
+    if request.seed < 0:
+        raise HTTPException(status_code=400, detail="seed must not be negative")
+    try:
+        params = scenario_params(request.scenario)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
+        job = stress_jobs.submit(
+            [spv.spv_id for spv in request.spvs],
+            [spv.features for spv in request.spvs],
+            [spv.loan_to_value for spv in request.spvs],
+            [spv.exposure for spv in request.spvs],
+            paths,
+            request.seed,
+            params
+        )
+    except ExecutorSaturated:
+        raise HTTPException(
+            status_code=503,
+            detail="Service busy: stress test queue is full",
+            headers={"Retry-After": "30"}
+        )
+    return {
+        "status": "accepted",
+        "job_id": job.job_id,
+        "status_url": f"/api/v1/risk/stress_test/{job.job_id}",
+        "spvs": job.spvs,
+        "paths": paths
+    }
+
+@app.get("/api/v1/risk/stress_test")
+async def list_stress_tests():
+    """
+    List recent stress tests without their results
+    """
+    return {"jobs": stress_jobs.list()}
+
+@app.get("/api/v1/risk/stress_test/{job_id}", responses=BATCH_RESPONSES)
+async def get_stress_test(job_id: str, accept: Optional[str] = Header(None)):
+    """
+    Status and progress of a stress test, with the portfolio and per-SPV
+    results once completed (JSON, or MessagePack / Arrow IPC via Accept)
+    """
+    job = stress_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Stress test not found")
+    if job.result is None:
+        return job.to_dict()
+    media_type = batch_media_type(accept)
+    
+    try:
+        body = await run_in_executor("inference", stress_result_body, job, media_type)
+        return Response(content=body, media_type=media_type)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Stress test encoding error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Stress test encoding error: {str(e)}")
+
+# Precomputed Risk Index
+@app.post("/api/v1/risk/index/refresh")
+async def refresh_risk_index():
+    """
+    Batch-score the pipeline's SPV feature table now instead of waiting for
+    the next scheduled check
+    """
+    try:
+        rebuilt = await asyncio.get_running_loop().run_in_executor(None, risk_index.refresh, True)
+    except Exception as e:
+        logger.error(f"Risk index rebuild error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Risk index rebuild error: {str(e)}")
+    if not rebuilt:
+        raise HTTPException(status_code=404, detail=f"No SPV feature table at {risk_index.path}")
+    return risk_index.stats()
+
+@app.put("/api/v1/risk/{spv_id}/features")
+async def update_risk_features(spv_id: str, request: RiskFeaturesUpdate):
+    """
+    Rescore one SPV's new features into the risk index
+    """
+    try:
+        return risk_index.put(spv_id, request.features, request.updated_at)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/api/v1/risk/{spv_id}")
+async def get_risk_score(spv_id: str):
+    """
+    Precomputed risk score of an SPV, with when its features were last
+    updated and when it was scored
+    """
+    entry = risk_index.get(spv_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="SPV not in risk index")
+    return entry
+
+# Streaming Bulk Scoring
+NDJSON_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {"application/x-ndjson": {"schema": {"type": "string", "format": "binary"}}}
+    }
+}
+
+def encode_ndjson(lines: List[dict]) -> bytes:
+    return "".join(json.dumps(line) + "\n" for line in lines).encode()
+
+def stream_records(lines: List[Optional[bytes]], field: str):
+    """Parse a chunk of NDJSON lines, requiring a dict-valued field; returns (records, errors)"""
+    records, errors = parse_lines(lines)
+    for i, record in enumerate(records):
+        if errors[i] is None and not isinstance(record.get(field), dict):
+            errors[i] = f"Missing or invalid {field}"
+    return records, errors
+
+def value_ndjson_chunk(bundle, numbers: List[int], lines: List[Optional[bytes]]):
+    """Value one chunk of streamed records; returns (NDJSON bytes, records, failures)"""
+    records, errors = stream_records(lines, "property_data")
+    valid = [i for i, error in enumerate(errors) if error is None]
+    predictions, lower, upper, confidence, value_errors, _ = value_properties_batch(
+        bundle, [records[i]["property_data"] for i in valid]
+    )
+    for j, i in enumerate(valid):
+        if value_errors[j] is None and not np.isfinite(predictions[j]):
+            value_errors[j] = "Valuation is not finite"
+        errors[i] = value_errors[j]
+    
+    output = []
+    values = dict(zip(valid, range(len(valid))))
+    for i, line in enumerate(numbers):
+        spv_id = records[i].get("spv_id") if records[i] is not None else None
+        if errors[i] is not None:
+            output.append({"line": line, "spv_id": spv_id, "error": errors[i]})
+            continue
+        j = values[i]
+        output.append({
+            "line": line,
+            "spv_id": spv_id,
+            "value": float(predictions[j]),
+            "lower_ci": float(lower[j]),
+            "upper_ci": float(upper[j]),
+            "confidence": confidence,
+            "model_version": bundle.version
+        })
+    return encode_ndjson(output), len(numbers), sum(1 for e in errors if e is not None)
+
+def score_ndjson_chunk(numbers: List[int], lines: List[Optional[bytes]]):
+    """Risk-score one chunk of streamed records; returns (NDJSON bytes, records, failures)"""
+    records, errors = stream_records(lines, "features")
+    valid = [i for i, error in enumerate(errors) if error is None]
+    scored, score_errors = score_risk_records([records[i]["features"] for i in valid])
+    for j, i in enumerate(valid):
+        errors[i] = score_errors[j]
+    
+    output = []
+    scored = iter(scored)
+    for i, line in enumerate(numbers):
+        spv_id = records[i].get("spv_id") if records[i] is not None else None
+        if errors[i] is not None:
+            output.append({"line": line, "spv_id": spv_id, "error": errors[i]})
+        else:
+            output.append({"line": line, "spv_id": spv_id, "model_version": RISK_MODEL_VERSION, **next(scored)})
+    return encode_ndjson(output), len(numbers), sum(1 for e in errors if e is not None)
+
+async def run_stream_chunk(fn, *args, numbers: List[int]):
+    """
+    Score a streamed chunk on the inference executor. A full queue delays the
+    stream instead of failing it; a chunk that times out is reported per line.
+    """
+    while True:
+        try:
+            return await run_in_executor("inference", fn, *args)
+        except HTTPException as e:
+            if e.status_code == 503:
+                await asyncio.sleep(0.05)
+                continue
+            return encode_ndjson([{"line": line, "error": e.detail} for line in numbers]), len(numbers), len(numbers)
+
+@app.post("/api/v1/avm/predict_stream", openapi_extra=NDJSON_BODY)
+async def predict_valuation_stream():
+    """
+    Value an NDJSON upload of {"spv_id", "property_data"} records, streaming
+    NDJSON results in input order as each chunk is scored
+    """
+    # The whole stream is valued with the bundle leased here
+    bundle = active_bundle("avm")
+    
+    async def score_chunk(numbers, lines):
+        return await run_stream_chunk(value_ndjson_chunk, bundle, numbers, lines, numbers=numbers)
+    
+    return NDJSONStreamResponse(score_chunk)
+
+@app.post("/api/v1/risk/score_stream", openapi_extra=NDJSON_BODY)
+async def calculate_risk_score_stream():
+    """
+    Risk-score an NDJSON upload of {"spv_id", "features"} records, streaming
+    NDJSON results in input order as each chunk is scored
+    """
+    async def score_chunk(numbers, lines):
+        return await run_stream_chunk(score_ndjson_chunk, numbers, lines, numbers=numbers)
+    
+    return NDJSONStreamResponse(score_chunk)
+
 # Predictive Maintenance Endpoints
 @app.post("/api/v1/maintenance/predict")
 async def predict_maintenance(property_id: str, data: dict):
@@ -341,7 +1545,7 @@ async def predict_maintenance(property_id: str, data: dict):
         if predictions:
             priority_order = {"HIGH": 0, "MEDIUM": 1, "LOW": 2}
             predictions.sort(key=lambda x: priority_order.get(x["priority"], 3))
-            result = predictions[0]
+            result = dict(predictions[0])
             result["property_id"] = property_id
             result["all_predictions"] = predictions
             return result
@@ -358,82 +1562,339 @@ async def predict_maintenance(property_id: str, data: dict):
         logger.error(f"Maintenance prediction error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+def schedule_maintenance(records: List[dict], k: int, budget: Optional[float]):
+    """
+    Evaluate every component rule over all properties and select the k most
+    urgent items within budget.
+    Returns (item rows, item dicts in rank order, candidates, errors).
+    """
+    X, errors = extract_maintenance_features_batch(records)
+    items = evaluate_maintenance_batch(X)
+    selected = top_k(items, k, budget)
+    return items.rows[selected].tolist(), items.to_dicts(selected), len(items), errors
+
+@app.post("/api/v1/maintenance/schedule")
+async def schedule_portfolio_maintenance(request: MaintenanceScheduleRequest):
+    """
+    Rank maintenance needs across many properties and return the most urgent
+    top_k items, optionally restricted to some SPVs and to a cost budget
+    """
+    REQUEST_ITEMS.labels("/api/v1/maintenance/schedule").observe(len(request.properties))
+    if len(request.properties) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large: {len(request.properties)} properties (max {MAX_BATCH_SIZE})"
+        )
+    if request.top_k < 1:
+        raise HTTPException(status_code=400, detail="top_k must be positive")
+    if request.budget is not None and request.budget < 0:
+        raise HTTPException(status_code=400, detail="budget must not be negative")
+    
+    try:
+        properties = request.properties
+        if request.spv_ids is not None:
+            spv_ids = set(request.spv_ids)
+            properties = [p for p in properties if p.spv_id in spv_ids]
+        
+        rows, items, candidates, errors = await run_in_executor(
+            "inference", schedule_maintenance, [p.data for p in properties], request.top_k, request.budget
+        )
+        
+        scheduled = []
+        for rank, (row, item) in enumerate(zip(rows, items), start=1):
+            prop = properties[row]
+            scheduled.append({"rank": rank, "property_id": prop.property_id, "spv_id": prop.spv_id, **item})
+        total_cost = sum(item["estimated_cost"] for item in items)
+        return {
+            "evaluated": len(properties),
+            "candidates": candidates,
+            "count": len(scheduled),
+            "total_cost": total_cost,
+            "budget_remaining": None if request.budget is None else request.budget - total_cost,
+            "items": scheduled,
+            "errors": [
+                {"property_id": properties[i].property_id, "error": error}
+                for i, error in enumerate(errors) if error is not None
+            ]
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Maintenance scheduling error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Maintenance scheduling error: {str(e)}")
+
 # Model Management Endpoints
+def model_type_name(model) -> str:
+    if isinstance(model, FlatEnsemble):
+        return model.estimator_name
+    return type(model).__name__
+
+def model_precision(model) -> dict:
+    """Serving precision of a model and, for float32, its accuracy check"""
+    if not isinstance(model, FlatEnsemble):
+        return {"precision": "float64"}
+    return {"precision": model.precision, "precision_check": model.meta.get("precision_check")}
+
 @app.get("/api/v1/models/status")
 async def get_model_status():
     """
     Get status of all ML models
     """
+    avm = registry.get("avm")
+    risk = registry.get("risk")
     return {
         "avm": {
-            "status": "active" if models["avm"] is not None else "inactive",
-            "version": "v2.3.1",
+            "status": "active" if avm is not None else "inactive",
+            "version": avm.version if avm else AVM_MODEL_VERSION,
             "accuracy": 0.952,
-            "type": type(models["avm"]).__name__ if models["avm"] else None
+            "type": model_type_name(avm.model) if avm else None,
+            "trained_at": avm.trained_at if avm else None,
+            "metrics": avm.metrics if avm else {},
+            **(model_precision(avm.model) if avm else {})
         },
         "risk": {
-            "status": "active" if models["risk"] is not None else "inactive",
-            "version": "v1.5.0",
+            "status": "active" if risk is not None else "inactive",
+            "version": risk.version if risk else RISK_MODEL_VERSION,
             "auc": 0.89,
-            "type": type(models["risk"]).__name__ if models["risk"] else None
+            "type": model_type_name(risk.model) if risk else None,
+            "trained_at": risk.trained_at if risk else None,
+            "metrics": risk.metrics if risk else {},
+            **(model_precision(risk.model) if risk else {})
         },
-        "maintenance": {"status": "active", "version": "v1.2.0", "accuracy": 0.915}
+        "maintenance": {"status": "active", "version": "v1.2.0", "accuracy": 0.915},
+        "inference_backend": INFERENCE_BACKEND,
+        "compiled_max_rows": COMPILED_MAX_ROWS,
+        "serving_precision": SERVING_PRECISION
     }
 
 class TrainingData(BaseModel):
     features: List[List[float]]
     targets: List[float]
     model_type: str  # "avm" or "risk"
+    incremental: bool = False  # continue the active model on this data instead of refitting
+    new_trees: Optional[int] = None  # trees added by an incremental update
+    search: bool = False  # cross-validated hyperparameter search before the final fit
+    search_trials: Optional[int] = None  # configurations sampled by a search
 
-@app.post("/api/v1/models/train")
+class TableTrainingData(BaseModel):
+    model_type: str  # "avm" or "risk"
+    path: str  # Parquet or Arrow IPC file, relative to DATA_OUTPUT_PATH
+    target_column: str
+    feature_columns: Optional[List[str]] = None  # defaults to the model's feature names
+    incremental: bool = False
+    new_trees: Optional[int] = None
+    search: bool = False
+    search_trials: Optional[int] = None
+
+TABLE_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "application/vnd.apache.parquet": {"schema": {"type": "string", "format": "binary"}},
+            "application/vnd.apache.arrow.file": {"schema": {"type": "string", "format": "binary"}}
+        }
+    }
+}
+
+def table_source(model_type: str, path: str, target_column: str, feature_columns: Optional[List[str]],
+                 delete_after_load: bool = False) -> TableSource:
+    """TableSource over the given columns, defaulting to the model's feature names"""
+    if model_type not in ("avm", "risk"):
+        raise HTTPException(status_code=400, detail="Invalid model_type")
+    if not feature_columns:
+        feature_columns = AVM_FEATURES if model_type == "avm" else RISK_FEATURES
+    return TableSource(path, tuple(feature_columns), target_column, delete_after_load)
+
+def submit_training(model_type: str, data, samples: int, incremental: bool = False,
+                    new_trees: Optional[int] = None, search: bool = False,
+                    search_trials: Optional[int] = None) -> Dict:
+    """
+    Submit a full, incremental or search training job on (X, y) arrays or a
+    table; returns the 202 response body
+    """
+    if model_type not in ("avm", "risk"):
+        raise HTTPException(status_code=400, detail="Invalid model_type")
+    if incremental and search:
+        raise HTTPException(status_code=400, detail="incremental and search cannot be combined")
+    
+    current = active_bundle(model_type)
+    base_version = AVM_MODEL_VERSION if model_type == "avm" else RISK_MODEL_VERSION
+    try:
+        if incremental:
+            if not current.scaler_fitted or current.trained_at is None:
+                raise HTTPException(
+                    status_code=409,
+                    detail="No trained model to continue; submit a full training job first"
+                )
+            new_trees = INCREMENTAL_TREES if new_trees is None else new_trees
+            if new_trees < 1:
+                raise HTTPException(status_code=400, detail="new_trees must be positive")
+            job = training_jobs.submit_update(
+                model_type,
+                current.version,
+                data,
+                samples,
+                new_version(base_version),
+                new_trees,
+                INCREMENTAL_MAX_TREES
+            )
+        elif search:
+            search_trials = SEARCH_TRIALS if search_trials is None else search_trials
+            if search_trials < 1:
+                raise HTTPException(status_code=400, detail="search_trials must be positive")
+            job = training_jobs.submit_search(
+                model_type,
+                fresh_estimator(current.model),
+                fresh_estimator(current.scaler),
+                data,
+                samples,
+                new_version(base_version),
+                search_trials
+            )
+        else:
+            # Fit fresh copies of the served estimator and scaler
+            job = training_jobs.submit(
+                model_type,
+                fresh_estimator(current.model),
+                fresh_estimator(current.scaler),
+                data,
+                samples,
+                new_version(base_version)
+            )
+    except TrainingConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ExecutorSaturated:
+        raise HTTPException(
+            status_code=503,
+            detail="Service busy: training queue is full",
+            headers={"Retry-After": "30"}
+        )
+    
+    return {
+        "status": "accepted",
+        "job_id": job.job_id,
+        "status_url": f"/api/v1/models/jobs/{job.job_id}",
+        "samples": samples,
+        "model_type": model_type,
+        "mode": job.mode,
+        "version": job.version
+    }
+
+@app.post("/api/v1/models/train", status_code=202)
 async def train_model(data: TrainingData):
     """
-    Train ML models with new data
+    Submit a training job; the trained bundle is swapped in when it completes
     """
     try:
         X = np.array(data.features)
         y = np.array(data.targets)
+        if X.ndim != 2 or len(X) != len(y):
+            raise HTTPException(status_code=400, detail="features must be a 2D array with one row per target")
         
-        if data.model_type == "avm":
-            # Train AVM model
-            models["scaler_avm"].fit(X)
-            X_scaled = models["scaler_avm"].transform(X)
-            models["avm"].fit(X_scaled, y)
-            
-            # Save model
-            model_path = "/app/models"
-            joblib.dump(models["avm"], f"{model_path}/avm_model.pkl")
-            joblib.dump(models["scaler_avm"], f"{model_path}/scaler_avm.pkl")
-            
-            return {
-                "status": "success",
-                "message": "AVM model trained successfully",
-                "samples": len(y),
-                "model_type": "avm"
-            }
+        return submit_training(
+            data.model_type, (X, y), len(y), data.incremental, data.new_trees, data.search, data.search_trials
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Training error: {str(e)}")
+
+@app.post("/api/v1/models/train_table", status_code=202)
+async def train_model_from_table(data: TableTrainingData):
+    """
+    Submit a training job on a Parquet or Arrow IPC table written by the
+    data pipeline; the training worker reads the selected columns itself
+    """
+    try:
+        source = table_source(data.model_type, resolve_data_path(data.path), data.target_column, data.feature_columns)
+        samples = await asyncio.to_thread(source.inspect)
+        return submit_training(
+            data.model_type, source, samples, data.incremental, data.new_trees, data.search, data.search_trials
+        )
+    except TrainingDataError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Training error: {str(e)}")
+
+@app.post("/api/v1/models/train_upload", status_code=202, openapi_extra=TABLE_BODY)
+async def train_model_from_upload(
+    request: Request,
+    model_type: str,
+    target_column: str,
+    feature_columns: Optional[str] = None,
+    incremental: bool = False,
+    new_trees: Optional[int] = None,
+    search: bool = False,
+    search_trials: Optional[int] = None
+):
+    """
+    Submit a training job on an uploaded Parquet or Arrow IPC file (the raw
+    request body). feature_columns is comma separated. The body is spooled to
+    disk as it arrives and removed once the training worker has read it.
+    """
+    path = new_upload_path()
+    submitted = False
+    try:
+        columns = [c for c in feature_columns.split(",") if c] if feature_columns else None
+        source = table_source(model_type, path, target_column, columns, delete_after_load=True)
+        size = 0
+        with open(path, "wb") as f:
+            async for chunk in request.stream():
+                size += len(chunk)
+                if size > MAX_UPLOAD_BYTES:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"Upload too large (max {MAX_UPLOAD_BYTES} bytes)"
+                    )
+                f.write(chunk)
+        if size == 0:
+            raise HTTPException(status_code=400, detail="Empty upload")
         
-        elif data.model_type == "risk":
-            # Train Risk model
-            models["scaler_risk"].fit(X)
-            X_scaled = models["scaler_risk"].transform(X)
-            models["risk"].fit(X_scaled, y)
-            
-            # Save model
-            model_path = "/app/models"
-            joblib.dump(models["risk"], f"{model_path}/risk_model.pkl")
-            joblib.dump(models["scaler_risk"], f"{model_path}/scaler_risk.pkl")
-            
-            return {
-                "status": "success",
-                "message": "Risk model trained successfully",
-                "samples": len(y),
-                "model_type": "risk"
-            }
-        else:
-            raise HTTPException(status_code=400, detail="Invalid model_type")
-            
+        samples = await asyncio.to_thread(source.inspect)
+        response = submit_training(model_type, source, samples, incremental, new_trees, search, search_trials)
+        submitted = True
+        return response
+    except TrainingDataError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Training error: {str(e)}")
+    finally:
+        if not submitted:
+            discard(path)
+
+@app.get("/api/v1/models/jobs")
+async def list_training_jobs():
+    """
+    List recent training jobs
+    """
+    return {"jobs": training_jobs.list()}
+
+@app.get("/api/v1/models/jobs/{job_id}")
+async def get_training_job(job_id: str):
+    """
+    Get status and progress of a training job
+    """
+    job = training_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Training job not found")
+    return job
+
+@app.post("/api/v1/models/reload")
+async def reload_models():
+    """
+    Check the model directory now instead of waiting for the next poll;
+    bundles whose manifest changed are loaded, warmed and swapped in
+    """
+    if not (readiness["models_loaded"] and readiness["warmed"]):
+        raise HTTPException(status_code=503, detail="Models are loading", headers={"Retry-After": "5"})
+    reloaded = await model_watcher.check()
+    return {"reloaded": reloaded, "models": registry.versions()}
+
+IMPORT_SECONDS = time.perf_counter() - IMPORT_STARTED
 
 if __name__ == "__main__":
     uvicorn.run(
@@ -0,0 +1,248 @@
+"""
+Prometheus Metrics
+Request latency broken down by phase, event-loop lag and executor/batcher state
+"""
+
+import asyncio
+import contextvars
+import functools
+import time
+import logging
+from typing import Callable, Dict, Optional
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, HistogramMetricFamily
+from starlette.routing import Match
+
+from batching import BATCH_SIZE_BUCKETS
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+ITEM_BUCKETS = (1, 10, 100, 1000, 5000, 10000, 50000)
+
+REQUEST_LATENCY = Histogram(
+    "ml_http_request_duration_seconds", "HTTP request latency",
+    ["method", "route", "status"], buckets=LATENCY_BUCKETS
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "ml_http_requests_in_flight", "HTTP requests currently being served", ["route"]
+)
+REQUEST_PHASE = Histogram(
+    "ml_http_request_phase_seconds",
+    "Time spent per request phase: request_validation (body parsing and pydantic), "
+    "handler (endpoint incl. inference), response_validation (response_model), "
+    "json_encoding, and streaming for streamed responses",
+    ["route", "phase"], buckets=LATENCY_BUCKETS
+)
+INFERENCE_LATENCY = Histogram(
+    "ml_inference_duration_seconds", "Time executor tasks spend running on a worker",
+    ["executor", "task"], buckets=LATENCY_BUCKETS
+)
+QUEUE_WAIT = Histogram(
+    "ml_executor_queue_wait_seconds", "Executor task latency not spent running (queueing and hand-off)",
+    ["executor"], buckets=LATENCY_BUCKETS
+)
+REQUEST_ITEMS = Histogram(
+    "ml_request_batch_items", "Records per batch request", ["route"], buckets=ITEM_BUCKETS
+)
+LOOP_LAG = Histogram(
+    "ml_event_loop_lag_seconds", "Delay of event-loop callbacks beyond their scheduled time",
+    buckets=LATENCY_BUCKETS
+)
+REQUEST_ERRORS = Counter(
+    "ml_http_request_exceptions_total", "Requests that raised an unhandled exception", ["route"]
+)
+
+
+class RequestTimings:
+    """Timestamps of one request's phases, shared through a context variable"""
+    __slots__ = ("handler_start", "handler_end", "render_seconds", "streaming")
+
+    def __init__(self):
+        self.handler_start: Optional[float] = None
+        self.handler_end: Optional[float] = None
+        self.render_seconds = 0.0
+        self.streaming = False
+
+
+_timings: contextvars.ContextVar[Optional[RequestTimings]] = contextvars.ContextVar(
+    "request_timings", default=None
+)
+
+
+def mark_streaming():
+    """Record the current request's post-handler time as streaming rather than serialization"""
+    timings = _timings.get()
+    if timings is not None:
+        timings.streaming = True
+
+
+class TimedJSONResponse(JSONResponse):
+    """JSONResponse that records how long encoding the body took"""
+
+    def render(self, content) -> bytes:
+        started = time.perf_counter()
+        body = super().render(content)
+        timings = _timings.get()
+        if timings is not None:
+            timings.render_seconds += time.perf_counter() - started
+        return body
+
+
+class TimedRoute(APIRoute):
+    """
+    APIRoute that records when its endpoint starts and returns, separating
+    request validation and response serialization from the handler itself.
+    """
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        if asyncio.iscoroutinefunction(endpoint):
+            endpoint = _timed_endpoint(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+
+def _timed_endpoint(endpoint: Callable) -> Callable:
+    @functools.wraps(endpoint)
+    async def wrapper(*args, **kwargs):
+        timings = _timings.get()
+        if timings is not None:
+            timings.handler_start = time.perf_counter()
+        try:
+            return await endpoint(*args, **kwargs)
+        finally:
+            if timings is not None:
+                timings.handler_end = time.perf_counter()
+    return wrapper
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording per-route latency, phase timings and in-flight
+    requests. Routes are labelled by their path template so label
+    cardinality stays bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    def _route(self, scope) -> str:
+        for route in scope["app"].router.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return getattr(route, "path", "other")
+        return "unmatched"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        route = self._route(scope)
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        timings = RequestTimings()
+        token = _timings.set(timings)
+        in_flight = REQUESTS_IN_FLIGHT.labels(route)
+        in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception:
+            REQUEST_ERRORS.labels(route).inc()
+            raise
+        finally:
+            finished = time.perf_counter()
+            in_flight.dec()
+            _timings.reset(token)
+            REQUEST_LATENCY.labels(scope["method"], route, str(status["code"])).observe(finished - started)
+            if timings.handler_start is not None and timings.handler_end is not None:
+                REQUEST_PHASE.labels(route, "request_validation").observe(timings.handler_start - started)
+                REQUEST_PHASE.labels(route, "handler").observe(timings.handler_end - timings.handler_start)
+            if timings.handler_end is not None and timings.streaming:
+                REQUEST_PHASE.labels(route, "streaming").observe(finished - timings.handler_end)
+            elif timings.handler_start is not None and timings.handler_end is not None:
+                REQUEST_PHASE.labels(route, "response_validation").observe(
+                    max(0.0, finished - timings.handler_end - timings.render_seconds)
+                )
+                REQUEST_PHASE.labels(route, "json_encoding").observe(timings.render_seconds)
+
+
+class ServiceCollector:
+    """Exposes executor, micro-batcher and cache state at scrape time"""
+
+    def __init__(self, executors: Dict, batchers: Dict, caches: Dict):
+        self.executors = executors
+        self.batchers = batchers
+        self.caches = caches
+
+    def collect(self):
+        pending = GaugeMetricFamily("ml_executor_pending", "Executor tasks queued or running", labels=["executor"])
+        capacity = GaugeMetricFamily("ml_executor_capacity", "Executor workers plus queue slots", labels=["executor"])
+        saturation = GaugeMetricFamily("ml_executor_saturation", "Fraction of executor capacity in use", labels=["executor"])
+        tasks = CounterMetricFamily("ml_executor_tasks", "Executor tasks by outcome", labels=["executor", "outcome"])
+        for name, executor in self.executors.items():
+            stats = executor.stats()
+            pending.add_metric([name], stats["pending"])
+            capacity.add_metric([name], executor.capacity)
+            saturation.add_metric([name], stats["saturation"])
+            for outcome in ("completed", "rejected", "timed_out"):
+                tasks.add_metric([name, outcome], stats[outcome])
+        yield from (pending, capacity, saturation, tasks)
+
+        batch_sizes = HistogramMetricFamily(
+            "ml_microbatch_size", "Rows per coalesced model call", labels=["batcher"]
+        )
+        batch_pending = GaugeMetricFamily("ml_microbatch_pending", "Rows waiting for a batch", labels=["batcher"])
+        for name, batcher in self.batchers.items():
+            cumulative, buckets = 0, []
+            for bound, count in zip(BATCH_SIZE_BUCKETS, batcher.size_counts):
+                cumulative += count
+                buckets.append((str(bound), cumulative))
+            buckets.append(("+Inf", batcher.batches))
+            batch_sizes.add_metric([name], buckets, batcher.items)
+            batch_pending.add_metric([name], batcher.pending)
+        yield from (batch_sizes, batch_pending)
+
+        entries = GaugeMetricFamily("ml_cache_entries", "Cached prediction results", labels=["cache"])
+        events = CounterMetricFamily("ml_cache_events", "Prediction cache events", labels=["cache", "event"])
+        for name, cache in self.caches.items():
+            stats = cache.stats()
+            entries.add_metric([name], stats["entries"])
+            for event in ("hits", "misses", "evictions", "expirations", "invalidations"):
+                events.add_metric([name, event], stats[event])
+        yield from (entries, events)
+
+
+def timed_call(fn: Callable, *args):
+    """Run fn(*args) and return (result, seconds); executed on the worker"""
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - started
+
+
+def register_collector(executors: Dict, batchers: Dict, caches: Dict):
+    REGISTRY.register(ServiceCollector(executors, batchers, caches))
+
+
+async def monitor_loop_lag(interval: float = 0.25):
+    """Sleep in a loop and record how late each wake-up is"""
+    loop = asyncio.get_running_loop()
+    while True:
+        scheduled = loop.time() + interval
+        await asyncio.sleep(interval)
+        LOOP_LAG.observe(max(0.0, loop.time() - scheduled))
+
+
+def render_metrics():
+    """Return (body, content type) in the Prometheus text exposition format"""
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
@@ -14,9 +14,9 @@ MLFLOW_TRACKING_URI = os.getenv('MLFLOW_TRACKING_URI', 'http://localhost:5000')
 EXPERIMENT_NAME = 'rwa-defi-models'
 MODEL_REGISTRY_NAME = 'rwa-models'
 
-def setup_mlflow():
+def setup_mlflow(tracking_uri=MLFLOW_TRACKING_URI):
     """Initialize MLflow tracking and experiments"""
-    mlflow.set_tracking_uri(MLFLOW_TRACKING_URI)
+    mlflow.set_tracking_uri(tracking_uri)
     
     # Create experiment if it doesn't exist
     try:
@@ -67,8 +67,8 @@ def transition_model_stage(model_name, version, stage):
     except Exception as e:
         print(f"Error transitioning model: {e}")
 
-def log_model_metrics(metrics, params=None, artifacts=None):
-    """Log model metrics, parameters, and artifacts to MLflow"""
+def log_model_metrics(metrics, params=None, artifacts=None, model=None):
+    """Log model metrics, parameters, artifacts, and optionally the model itself to MLflow"""
     with mlflow.start_run() as run:
         # Log parameters
         if params:
@@ -83,6 +83,10 @@ def log_model_metrics(metrics, params=None, artifacts=None):
             for artifact_name, artifact_path in artifacts.items():
                 mlflow.log_artifact(artifact_path, artifact_name)
         
+        # Log model under "model", where register_model expects it
+        if model is not None:
+            mlflow.sklearn.log_model(model, "model")
+        
         return run.info.run_id
 
 def load_production_model(model_name):
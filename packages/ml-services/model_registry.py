@@ -0,0 +1,390 @@
+"""
+Serving Model Registry
+Versioned model + scaler bundles that are swapped in atomically
+"""
+
+import contextvars
+import json
+import os
+import threading
+import time
+import logging
+from dataclasses import dataclass, field, replace
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from model_store import (
+    FlatEnsemble, arrays_lock, compare_precision, feature_contributions, flatten, load_flat,
+    predict_with_intervals, probe_inputs, save_flat, supports, supports_intervals
+)
+
+logger = logging.getLogger(__name__)
+
+# "compiled" serves tree ensembles from flat node arrays, "sklearn" from the pickles
+INFERENCE_BACKEND = os.getenv("ML_INFERENCE_BACKEND", "compiled").lower()
+if INFERENCE_BACKEND not in ("compiled", "sklearn"):
+    raise ValueError(f"Unknown ML_INFERENCE_BACKEND: {INFERENCE_BACKEND}")
+
+# Batches larger than this are predicted by the sklearn estimator; the level-by-level
+# traversal only wins on small batches (0 disables the fallback)
+COMPILED_MAX_ROWS = {
+    "random_forest_regressor": int(os.getenv("ML_COMPILED_MAX_ROWS_RF", "768")),
+    "gradient_boosting_classifier": int(os.getenv("ML_COMPILED_MAX_ROWS_GBC", "128")),
+}
+
+# Memory-map the compiled arrays so they are shared across workers
+MMAP_MODELS = os.getenv("ML_MMAP_MODELS", "true").lower() in ("1", "true", "yes")
+
+# "float32" serves compiled ensembles from float32 node arrays once they pass an accuracy check
+SERVING_PRECISION = os.getenv("ML_SERVING_PRECISION", "float64").lower()
+if SERVING_PRECISION not in ("float64", "float32"):
+    raise ValueError(f"Unknown ML_SERVING_PRECISION: {SERVING_PRECISION}")
+
+# Largest float32 deviation from the float64 outputs accepted, relative to the output scale
+FLOAT32_TOLERANCE = float(os.getenv("ML_FLOAT32_TOLERANCE", "1e-5"))
+
+
+@dataclass(frozen=True)
+class ModelBundle:
+    """A fitted model together with the scaler it was trained with"""
+    name: str
+    model: Any
+    scaler: Any
+    version: str
+    trained_at: Optional[str] = None
+    metrics: Dict = field(default_factory=dict)
+    # Sample of scaled training inputs, persisted for precision checks
+    reference_inputs: Optional[np.ndarray] = field(default=None, repr=False, compare=False)
+
+    @property
+    def scaler_fitted(self) -> bool:
+        return self.scaler is not None and hasattr(self.scaler, "mean_")
+
+    def transform(self, features: np.ndarray) -> np.ndarray:
+        """Apply the bundle's scaler if it has been fitted"""
+        if self.scaler_fitted:
+            return self.scaler.transform(features)
+        return features
+
+
+def bundle_predict(bundle: ModelBundle, features: np.ndarray) -> np.ndarray:
+    """Scale and predict with a bundle; module-level so process pools can pickle it"""
+    return bundle.model.predict(bundle.transform(features))
+
+
+def bundle_predict_intervals(bundle: ModelBundle, features: np.ndarray, quantiles: Sequence[float]):
+    """
+    Scale and predict with a bundle, returning (predictions, lower, upper).
+    The bounds are quantiles of the individual tree outputs, or None when the
+    model does not expose per-tree outputs.
+    """
+    X = bundle.transform(features)
+    if not supports_intervals(bundle.model):
+        return bundle.model.predict(X), None, None
+    return predict_with_intervals(bundle.model, X, quantiles)
+
+
+def bundle_contributions(bundle: ModelBundle, features: np.ndarray):
+    """Tree-path (bias, contributions) of a bundle's model on scaled features"""
+    return feature_contributions(bundle.model, bundle.transform(features))
+
+
+# Bundles leased by the current request, released when its response completes
+_request_leases: contextvars.ContextVar[Optional[Dict[str, ModelBundle]]] = contextvars.ContextVar(
+    "request_leases", default=None
+)
+
+
+class ModelRegistry:
+    """
+    Holds the active bundle per model name.
+
+    Readers call get() once per request and use that bundle's model and
+    scaler together, so a concurrent publish() can never pair a model with
+    a scaler from another version.
+
+    Inside a request, lease() pins the bundle for the rest of the request and
+    counts it as in use until ModelLeaseMiddleware releases it. A bundle
+    replaced by publish() while leased stays listed as draining until its
+    last request finishes, so a hot reload can be followed to completion.
+    """
+
+    def __init__(self):
+        self._bundles: Dict[str, ModelBundle] = {}
+        self._lock = threading.Lock()
+        self._leases: Dict[Tuple[str, str], int] = {}
+        self._draining: Dict[Tuple[str, str], float] = {}
+
+    def get(self, name: str) -> Optional[ModelBundle]:
+        return self._bundles.get(name)
+
+    def lease(self, name: str) -> Optional[ModelBundle]:
+        """
+        Return the bundle this request already uses for name, or lease the
+        active one. Outside a request this is the same as get().
+        """
+        held = _request_leases.get()
+        if held is None:
+            return self.get(name)
+        bundle = held.get(name)
+        if bundle is not None:
+            return bundle
+        with self._lock:
+            bundle = self._bundles.get(name)
+            if bundle is None:
+                return None
+            key = (name, bundle.version)
+            self._leases[key] = self._leases.get(key, 0) + 1
+        held[name] = bundle
+        return bundle
+
+    def release(self, bundle: ModelBundle):
+        key = (bundle.name, bundle.version)
+        with self._lock:
+            remaining = self._leases.get(key, 0) - 1
+            if remaining > 0:
+                self._leases[key] = remaining
+                return
+            self._leases.pop(key, None)
+            replaced_at = self._draining.pop(key, None)
+        if replaced_at is not None:
+            logger.info(f"Drained {bundle.name} model {bundle.version} "
+                        f"{time.monotonic() - replaced_at:.3f}s after it was replaced")
+
+    def publish(self, bundle: ModelBundle) -> Optional[ModelBundle]:
+        """Make bundle the active version of its model; returns the previous bundle"""
+        with self._lock:
+            previous = self._bundles.get(bundle.name)
+            bundles = dict(self._bundles)
+            bundles[bundle.name] = bundle
+            self._bundles = bundles
+            if previous is not None and previous.version != bundle.version:
+                key = (previous.name, previous.version)
+                if self._leases.get(key):
+                    self._draining[key] = time.monotonic()
+        logger.info(f"Published {bundle.name} model {bundle.version}"
+                    + (f" (replacing {previous.version})" if previous else ""))
+        return previous
+
+    def versions(self) -> Dict[str, str]:
+        return {name: bundle.version for name, bundle in self._bundles.items()}
+
+    def lease_stats(self) -> Dict:
+        """In-flight requests per model version, and replaced versions still in use"""
+        with self._lock:
+            return {
+                "in_use": {f"{name}@{version}": count for (name, version), count in self._leases.items()},
+                "draining": [f"{name}@{version}" for name, version in self._draining],
+            }
+
+
+class ModelLeaseMiddleware:
+    """
+    ASGI middleware giving each request a lease scope and releasing the
+    bundles it leased once the response, including any stream, is complete.
+    """
+
+    def __init__(self, app, registry: ModelRegistry):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        held: Dict[str, ModelBundle] = {}
+        token = _request_leases.set(held)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _request_leases.reset(token)
+            for bundle in held.values():
+                self.registry.release(bundle)
+
+
+def _atomic_dump(obj, path: str):
+    import joblib
+
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    joblib.dump(obj, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def save_bundle(model_path: str, bundle: ModelBundle):
+    """Persist a bundle as {name}_model.pkl, scaler_{name}.pkl and {name}_meta.json"""
+    os.makedirs(model_path, exist_ok=True)
+    _atomic_dump(bundle.model, f"{model_path}/{bundle.name}_model.pkl")
+    _atomic_dump(bundle.scaler, f"{model_path}/scaler_{bundle.name}.pkl")
+    if supports(bundle.model):
+        with arrays_lock(model_path, bundle.name):
+            _save_arrays(model_path, bundle.name, bundle.model, bundle.version)
+    if bundle.reference_inputs is not None:
+        reference_path = f"{model_path}/{bundle.name}_reference.npy"
+        tmp_path = f"{reference_path}.tmp-{os.getpid()}"
+        with open(tmp_path, "wb") as f:
+            np.save(f, bundle.reference_inputs)
+        os.replace(tmp_path, reference_path)
+
+    meta_path = f"{model_path}/{bundle.name}_meta.json"
+    tmp_path = f"{meta_path}.tmp-{os.getpid()}"
+    with open(tmp_path, "w") as f:
+        json.dump({
+            "version": bundle.version,
+            "trained_at": bundle.trained_at,
+            "metrics": bundle.metrics,
+        }, f)
+    os.replace(tmp_path, meta_path)
+
+
+def _model_source(model_path: str, name: str, version: str) -> Dict:
+    """
+    Identity of the pickle that compiled arrays are built from. The version
+    alone is not enough: bundles without a manifest all share the default
+    version, so a replaced pickle is recognised by its mtime and size.
+    """
+    stat = os.stat(f"{model_path}/{name}_model.pkl")
+    return {"version": version, "mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+
+
+def _save_arrays(model_path: str, name: str, model, version: str):
+    flat = flatten(model)
+    flat.meta["bundle_version"] = version
+    flat.meta["source"] = _model_source(model_path, name, version)
+    save_flat(model_path, name, flat)
+
+
+def _serving_precision(model_path: str, name: str, flat: FlatEnsemble, version: str) -> FlatEnsemble:
+    """
+    The ensemble in ML_SERVING_PRECISION. float32 arrays are built once per
+    model pickle, checked against the float64 outputs on the bundle's reference
+    inputs (or on split-boundary probes for bundles saved without one) and
+    stored next to the float64 arrays. A bundle failing the check is served
+    in float64.
+    """
+    if SERVING_PRECISION == "float64":
+        return flat
+    mmap_mode = "r" if MMAP_MODELS else None
+    reduced = load_flat(model_path, name, mmap_mode=mmap_mode, precision=SERVING_PRECISION)
+    # float32 arrays are only reused when built from these float64 arrays' pickle
+    if reduced is not None and reduced.meta.get("source") == flat.meta.get("source"):
+        return reduced
+    with arrays_lock(model_path, name, SERVING_PRECISION):
+        # Another replica sharing the volume may have built them meanwhile
+        reduced = load_flat(model_path, name, mmap_mode=mmap_mode, precision=SERVING_PRECISION)
+        if reduced is not None and reduced.meta.get("source") == flat.meta.get("source"):
+            return reduced
+
+        reference_file = f"{model_path}/{name}_reference.npy"
+        X = np.load(reference_file) if os.path.exists(reference_file) else probe_inputs(flat)
+        reduced = flat.to_float32()
+        report = compare_precision(flat, reduced, X, FLOAT32_TOLERANCE)
+        if not report["passed"]:
+            logger.warning(f"{name} model {version} failed the float32 accuracy check "
+                           f"(max relative error {report['max_rel_error']:.2e}); serving float64")
+            return flat
+        reduced.meta["precision_check"] = report
+        save_flat(model_path, name, reduced)
+        logger.info(f"Serving {name} model {version} in float32: node arrays "
+                    f"{report['reference_bytes'] / 2**20:.1f} -> {report['reduced_bytes'] / 2**20:.1f} MiB, "
+                    f"max relative error {report['max_rel_error']:.2e} on {report['rows']} rows")
+        return load_flat(model_path, name, mmap_mode=mmap_mode, precision=SERVING_PRECISION)
+
+
+def _load_model(model_path: str, name: str, version: str, model_factory: Callable[[], Any]):
+    """
+    Load the model for a bundle. With the compiled backend, supported
+    ensembles are served from flat node arrays; pickles written before the
+    current array layout, or replaced since their arrays were built, are
+    converted once.
+    """
+    import joblib
+
+    model_file = f"{model_path}/{name}_model.pkl"
+    if not os.path.exists(model_file):
+        return model_factory()
+    if INFERENCE_BACKEND == "sklearn":
+        return joblib.load(model_file)
+
+    mmap_mode = "r" if MMAP_MODELS else None
+    source = _model_source(model_path, name, version)
+    flat = load_flat(model_path, name, mmap_mode=mmap_mode)
+    if flat is not None and flat.meta.get("source") == source:
+        flat = _serving_precision(model_path, name, flat, version)
+        if COMPILED_MAX_ROWS.get(flat.kind, 0) > 0:
+            return _with_fallback(flat, joblib.load(model_file))
+        return flat
+
+    model = joblib.load(model_file)
+    if not supports(model):
+        return model
+    with arrays_lock(model_path, name):
+        # Replicas sharing the volume convert one at a time; later ones load the result
+        flat = load_flat(model_path, name, mmap_mode=mmap_mode)
+        if flat is None or flat.meta.get("source") != source:
+            logger.info(f"Converting {name} model {version} to the memory-mapped array layout")
+            _save_arrays(model_path, name, model, version)
+            flat = load_flat(model_path, name, mmap_mode=mmap_mode)
+    return _with_fallback(_serving_precision(model_path, name, flat, version), model)
+
+
+def _with_fallback(flat: FlatEnsemble, model) -> FlatEnsemble:
+    """Attach the fitted sklearn model for batches above the compiled crossover"""
+    return flat.with_fallback(model, COMPILED_MAX_ROWS.get(flat.kind, 0))
+
+
+def persist_bundle(model_path: str, bundle: ModelBundle) -> ModelBundle:
+    """Save a freshly trained bundle and return it in its serving form"""
+    save_bundle(model_path, bundle)
+    if INFERENCE_BACKEND == "sklearn" or not supports(bundle.model):
+        return replace(bundle, reference_inputs=None)
+    model = load_flat(model_path, bundle.name, mmap_mode="r" if MMAP_MODELS else None)
+    model = _serving_precision(model_path, bundle.name, model, bundle.version)
+    return replace(bundle, model=_with_fallback(model, bundle.model), reference_inputs=None)
+
+
+def load_bundle(model_path: str, name: str, model_factory: Callable[[], Any],
+                scaler_factory: Callable[[], Any], default_version: str) -> ModelBundle:
+    """Load a persisted bundle, falling back to fresh unfitted objects"""
+    import joblib
+
+    scaler_file = f"{model_path}/scaler_{name}.pkl"
+    meta_file = f"{model_path}/{name}_meta.json"
+
+    meta = {}
+    if os.path.exists(meta_file):
+        with open(meta_file) as f:
+            meta = json.load(f)
+    version = meta.get("version", default_version)
+
+    model = _load_model(model_path, name, version, model_factory)
+    scaler = joblib.load(scaler_file) if os.path.exists(scaler_file) else scaler_factory()
+
+    return ModelBundle(
+        name=name,
+        model=model,
+        scaler=scaler,
+        version=version,
+        trained_at=meta.get("trained_at"),
+        metrics=meta.get("metrics", {}),
+    )
+
+
+def manifest_signature(model_path: str, name: str) -> Optional[Tuple[int, int, int]]:
+    """
+    Identity of a bundle's {name}_meta.json, or None if there is none.
+    save_bundle writes the manifest last and atomically, so a changed
+    signature means a complete new bundle is on disk.
+    """
+    try:
+        stat = os.stat(f"{model_path}/{name}_meta.json")
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+def new_version(base_version: str) -> str:
+    """Version string for a newly trained bundle"""
+    return f"{base_version}+{datetime.now().strftime('%Y%m%d%H%M%S%f')}"
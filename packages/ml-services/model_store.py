@@ -0,0 +1,685 @@
+"""
+Memory-Mapped Model Store
+Saves fitted tree ensembles as flat node arrays that load with mmap_mode
+"""
+
+import json
+import os
+import shutil
+import sys
+import logging
+import weakref
+from contextlib import contextmanager
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Arrays written per ensemble; each is one .npy file so it can be memory-mapped
+ARRAY_NAMES = ["feature", "threshold", "children", "value", "roots", "missing_left"]
+
+# Bumped whenever the on-disk array layout changes; older layouts are rebuilt
+LAYOUT_VERSION = 4
+
+# Feature id of leaf nodes (same as sklearn's TREE_UNDEFINED)
+LEAF_FEATURE = -2
+
+# Upper bound on (tree, row) pairs traversed at once, to bound temporaries
+MAX_TRAVERSAL_WIDTH = 1 << 20
+
+# Finished pairs are dropped from the traversal once they make up this share
+# of the active set; until then leaves simply loop back to themselves
+COMPACT_FRACTION = 0.5
+
+
+class FlatEnsemble:
+    """
+    A fitted tree ensemble compiled into contiguous node arrays.
+
+    Node arrays of all trees are concatenated: int32 feature and float64
+    threshold per node (leaves have feature LEAF_FEATURE), children as an
+    (n_nodes, 2) int32 array of global [right, left] indices so that
+    2 * node + (x <= threshold) selects the next node, one value per node,
+    roots holding each tree's first node, and a bool per node sending NaN
+    inputs left (sklearn's missing_go_to_left). Leaves are their own children. Loaded with mmap_mode='r', the arrays live in the page
+    cache and are shared by every worker process that maps the same files.
+
+    The level-by-level traversal beats sklearn on small batches only. When a
+    fitted sklearn fallback is attached, batches of more than fallback_rows
+    rows are predicted by it instead.
+
+    Inference walks every (tree, row) pair of a batch at once, one tree level
+    per step, periodically dropping pairs that have reached a leaf. Splits are evaluated on
+    float32 inputs and tree outputs are accumulated in sklearn's order, so
+    predictions are bit-for-bit identical to the source estimator.
+    """
+
+    def __init__(self, arrays: Dict[str, np.ndarray], meta: Dict, estimator=None):
+        self.feature = arrays["feature"]
+        self.threshold = arrays["threshold"]
+        self.children = arrays["children"]
+        self.value = arrays["value"]
+        self.roots = arrays["roots"]
+        self.missing_left = arrays["missing_left"]
+        self.meta = meta
+        self.kind = meta["kind"]
+        self.n_features_in_ = meta["n_features"]
+        self.estimator = estimator
+        self.precision = meta.get("precision", "float64")
+        self._children_flat = self.children.reshape(-1)
+        self.fallback = None
+        self.fallback_rows = 0
+
+        if self.kind == "gradient_boosting_classifier":
+            self.classes_ = np.array(meta["classes"])
+            self.learning_rate = meta["learning_rate"]
+            self.init_raw = np.array(meta["init_raw"], dtype=np.float64)
+            self.n_trees_per_stage = meta["n_trees_per_stage"]
+
+    @property
+    def estimator_name(self) -> str:
+        return self.meta["estimator"]
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, name).nbytes for name in ARRAY_NAMES)
+
+    def with_fallback(self, model, max_rows: int) -> "FlatEnsemble":
+        """Predict batches of more than max_rows rows with the fitted sklearn model; 0 disables"""
+        self.fallback = model if max_rows > 0 else None
+        self.fallback_rows = max_rows
+        return self
+
+    def falls_back(self, X: np.ndarray) -> bool:
+        return self.fallback is not None and len(X) > self.fallback_rows
+
+    def _prepare(self, X: np.ndarray) -> np.ndarray:
+        # sklearn evaluates splits on float32 inputs
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f"Expected {self.n_features_in_} features, got shape {X.shape}")
+        # Reject what sklearn's input validation rejects: infinity always, NaN for gradient boosting
+        if np.isinf(X).any():
+            raise ValueError("Input X contains infinity or a value too large for float32")
+        if self.kind == "gradient_boosting_classifier" and np.isnan(X).any():
+            raise ValueError(f"Input X contains NaN; {self.estimator_name} does not accept missing values")
+        return X
+
+    def _traverse(self, X: np.ndarray, missing: bool = False) -> np.ndarray:
+        """
+        Leaf node reached by each (tree, row) pair, flattened tree-major.
+        missing says whether X holds NaN, which then follows missing_left.
+        """
+        n_rows, n_features = X.shape
+        X_flat = X.reshape(-1)
+        leaves = np.empty(self.n_trees * n_rows, dtype=np.int32)
+
+        # Active pairs: position in leaves, current node and row offset into X_flat
+        position = np.arange(self.n_trees * n_rows, dtype=np.int32)
+        node = np.repeat(self.roots, n_rows)
+        row_offset = np.tile(np.arange(n_rows, dtype=np.int32) * n_features, self.n_trees)
+
+        while True:
+            feature = np.take(self.feature, node)
+            at_leaf = feature < 0
+            finished = np.count_nonzero(at_leaf)
+            if finished == len(node):
+                leaves[position] = node
+                return leaves
+            if finished > COMPACT_FRACTION * len(node):
+                inner = ~at_leaf
+                leaves[position[at_leaf]] = node[at_leaf]
+                position = position[inner]
+                node = node[inner]
+                row_offset = row_offset[inner]
+                feature = feature[inner]
+            # Pairs still parked on a leaf read an arbitrary value and stay put
+            feature += row_offset
+            go_left = self._go_left(X_flat, feature, node, missing)
+            node += node
+            node += go_left
+            node = np.take(self._children_flat, node)
+
+    def _go_left(self, X_flat: np.ndarray, offset: np.ndarray, node: np.ndarray, missing: bool) -> np.ndarray:
+        x = np.take(X_flat, offset)
+        go_left = x <= np.take(self.threshold, node)
+        if missing:
+            # NaN fails every comparison; sklearn sends it the way the split learned
+            go_left |= np.isnan(x) & np.take(self.missing_left, node)
+        return go_left
+
+    def tree_values(self, X: np.ndarray) -> np.ndarray:
+        """(n_trees, n_samples) output of every individual tree"""
+        X = self._prepare(X)
+        n_rows = len(X)
+        missing = bool(np.isnan(X).any())
+        values = np.empty((self.n_trees, n_rows))
+        chunk = max(1, MAX_TRAVERSAL_WIDTH // max(self.n_trees, 1))
+        for start in range(0, n_rows, chunk):
+            stop = min(start + chunk, n_rows)
+            leaves = self._traverse(X[start:stop], missing)
+            values[:, start:stop] = self.value[leaves].reshape(self.n_trees, stop - start)
+        return values
+
+    def _path_contributions(self, X: np.ndarray, missing: bool = False) -> np.ndarray:
+        """
+        (n_rows, n_features) sum over trees of the change in node value along
+        each decision path, credited to the feature split on at every step.
+        """
+        n_rows, n_features = X.shape
+        X_flat = X.reshape(-1)
+        totals = np.zeros(n_rows * n_features)
+
+        node = np.repeat(self.roots, n_rows)
+        row_offset = np.tile(np.arange(n_rows, dtype=np.int32) * n_features, self.n_trees)
+
+        while len(node):
+            feature = np.take(self.feature, node)
+            at_leaf = feature < 0
+            if np.count_nonzero(at_leaf) > COMPACT_FRACTION * len(node):
+                inner = ~at_leaf
+                node = node[inner]
+                row_offset = row_offset[inner]
+                feature = feature[inner]
+                if not len(node):
+                    break
+            # Parked leaves step to themselves and add a zero delta to a valid slot
+            np.maximum(feature, 0, out=feature)
+            feature += row_offset
+            go_left = self._go_left(X_flat, feature, node, missing)
+            parent_value = np.take(self.value, node).astype(np.float64, copy=False)
+            node += node
+            node += go_left
+            node = np.take(self._children_flat, node)
+            delta = np.take(self.value, node).astype(np.float64, copy=False) - parent_value
+            totals += np.bincount(feature, weights=delta, minlength=len(totals))
+        return totals.reshape(n_rows, n_features)
+
+    def contributions(self, X: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Tree-path (Saabas) attributions of a random forest: returns the bias
+        (mean root value, per row) and (n_samples, n_features) contributions
+        such that bias + contributions.sum(axis=1) equals the prediction up to
+        floating-point rounding.
+        """
+        if self.kind != "random_forest_regressor":
+            raise AttributeError("contributions are only available for random forests")
+        X = self._prepare(X)
+        n_rows = len(X)
+        missing = bool(np.isnan(X).any())
+        contributions = np.empty(X.shape)
+        chunk = max(1, MAX_TRAVERSAL_WIDTH // max(self.n_trees, 1))
+        for start in range(0, n_rows, chunk):
+            stop = min(start + chunk, n_rows)
+            contributions[start:stop] = self._path_contributions(X[start:stop], missing)
+        contributions /= self.n_trees
+        bias = np.full(n_rows, np.take(self.value, self.roots).mean(dtype=np.float64))
+        return bias, contributions
+
+    def decision_function(self, X: np.ndarray) -> np.ndarray:
+        if self.kind != "gradient_boosting_classifier":
+            raise AttributeError("decision_function is only available for gradient boosting")
+        if self.falls_back(X):
+            return self.fallback.decision_function(X)
+        K = self.n_trees_per_stage
+        values = self.tree_values(X)
+        n_rows = values.shape[1]
+
+        # Running sum init + lr * v_1 + lr * v_2 + ... in stage order, as sklearn does
+        steps = np.empty((self.n_trees // K + 1, K, n_rows))
+        steps[0] = self.init_raw[:, None]
+        np.multiply(values.reshape(-1, K, n_rows), self.learning_rate, out=steps[1:])
+        raw = np.add.accumulate(steps, axis=0)[-1].T
+        return raw.ravel() if K == 1 else raw
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        from scipy.special import expit
+        from sklearn.utils.extmath import softmax
+
+        if self.falls_back(X):
+            return self.fallback.predict_proba(X)
+        raw = self.decision_function(X)
+        if raw.ndim == 1:
+            proba = np.empty((len(raw), 2))
+            proba[:, 1] = expit(raw)
+            proba[:, 0] = 1 - proba[:, 1]
+            return proba
+        return softmax(raw, copy=True)
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        if self.falls_back(X):
+            return self.fallback.predict(X)
+        if self.kind == "gradient_boosting_classifier":
+            raw = self.decision_function(X)
+            encoded = (raw >= 0).astype(int) if raw.ndim == 1 else np.argmax(raw, axis=1)
+            return self.classes_[encoded]
+
+        return forest_mean(self.tree_values(X))
+
+    def make_estimator(self):
+        """Unfitted sklearn estimator with the same parameters, for retraining"""
+        from sklearn.base import clone
+        return clone(self.estimator)
+
+    def to_float32(self) -> "FlatEnsemble":
+        """
+        Copy with float32 thresholds and node values.
+
+        Inputs are already compared as float32, so each threshold is rounded
+        down to the largest float32 not above it: for every float32 x,
+        x <= t32 exactly when x <= t, and every row reaches the same leaf.
+        Only the leaf values are rounded (relative error below 6e-8); tree
+        outputs are still accumulated in float64.
+        """
+        threshold = self.threshold.astype(np.float32)
+        rounded_up = threshold.astype(np.float64) > self.threshold
+        threshold[rounded_up] = np.nextafter(threshold[rounded_up], np.float32(-np.inf))
+        arrays = {
+            "feature": np.asarray(self.feature),
+            "threshold": threshold,
+            "children": np.asarray(self.children),
+            "value": self.value.astype(np.float32),
+            "roots": np.asarray(self.roots),
+            "missing_left": np.asarray(self.missing_left),
+        }
+        return FlatEnsemble(arrays, {**self.meta, "precision": "float32"}, estimator=self.estimator)
+
+
+def forest_mean(values: np.ndarray) -> np.ndarray:
+    """Average (n_trees, n_samples) tree outputs exactly as sklearn's forest does"""
+    # Sum trees sequentially, then divide by the tree count
+    out = np.add.accumulate(values, axis=0)[-1]
+    out /= len(values)
+    return out
+
+
+def _precision_outputs(model: FlatEnsemble, X: np.ndarray) -> np.ndarray:
+    if model.kind == "gradient_boosting_classifier":
+        return model.predict_proba(X)
+    return model.predict(X)
+
+
+def probe_inputs(model: FlatEnsemble, n_rows: int = 2000, seed: int = 0) -> np.ndarray:
+    """
+    Inputs for precision checks when no holdout sample is stored: each
+    feature takes a split threshold of that feature, or one of the float32
+    values next to it, so rows sit on the decision boundaries where rounding
+    would show first.
+    """
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n_rows, model.n_features_in_)).astype(np.float32)
+    internal = np.asarray(model.feature) >= 0
+    for j in range(model.n_features_in_):
+        thresholds = np.asarray(model.threshold)[internal & (np.asarray(model.feature) == j)]
+        if not len(thresholds):
+            continue
+        picked = rng.choice(thresholds, size=n_rows).astype(np.float32)
+        step = rng.integers(-1, 2, size=n_rows)
+        picked[step < 0] = np.nextafter(picked[step < 0], np.float32(-np.inf))
+        picked[step > 0] = np.nextafter(picked[step > 0], np.float32(np.inf))
+        X[:, j] = picked
+    return X
+
+
+def compare_precision(reference: FlatEnsemble, reduced: FlatEnsemble, X: np.ndarray,
+                      tolerance: float) -> Dict:
+    """
+    Accuracy-regression check of a reduced-precision ensemble: outputs on X
+    (predictions, or class probabilities for classifiers) may differ from the
+    reference by at most tolerance relative to the reference's output scale,
+    and classifiers must predict the same classes. Also reports the memory
+    saved by the reduced node arrays.
+    """
+    expected = _precision_outputs(reference, X)
+    actual = _precision_outputs(reduced, X)
+    abs_error = np.abs(actual - expected)
+    scale = max(float(np.abs(expected).max()), 1e-12) if len(expected) else 1.0
+    max_abs_error = float(abs_error.max()) if abs_error.size else 0.0
+    passed = max_abs_error <= tolerance * scale
+    if reference.kind == "gradient_boosting_classifier":
+        passed = passed and bool(np.array_equal(reference.predict(X), reduced.predict(X)))
+    return {
+        "rows": int(len(X)),
+        "max_abs_error": max_abs_error,
+        "max_rel_error": max_abs_error / scale,
+        "tolerance": tolerance,
+        "passed": bool(passed),
+        "reference_bytes": int(reference.nbytes),
+        "reduced_bytes": int(reduced.nbytes),
+        "saved_fraction": 1.0 - reduced.nbytes / reference.nbytes,
+    }
+
+
+def _is_sklearn(model, class_name: str) -> bool:
+    """
+    isinstance check against an sklearn.ensemble class without importing
+    sklearn: a model can only be an instance once its module is loaded.
+    """
+    ensemble = sys.modules.get("sklearn.ensemble")
+    return ensemble is not None and isinstance(model, getattr(ensemble, class_name))
+
+
+# Concatenated leaf values and per-tree node offsets of sklearn forests
+_forest_values_cache = weakref.WeakKeyDictionary()
+
+# Compiled copies of sklearn forests served by the sklearn backend, for attributions
+_flat_cache = weakref.WeakKeyDictionary()
+
+
+def supports_intervals(model) -> bool:
+    """Whether per-tree outputs (and hence prediction intervals) are available"""
+    if isinstance(model, FlatEnsemble):
+        return model.kind == "random_forest_regressor"
+    return _is_sklearn(model, "RandomForestRegressor") and supports(model)
+
+
+def tree_values(model, X: np.ndarray) -> np.ndarray:
+    """
+    (n_trees, n_samples) outputs of every tree of a random forest, from one
+    batched traversal rather than a Python loop over estimator.predict.
+    """
+    if isinstance(model, FlatEnsemble):
+        if not model.falls_back(X):
+            return model.tree_values(X)
+        model = model.fallback
+    if not supports_intervals(model):
+        raise TypeError(f"Per-tree outputs are not available for {type(model).__name__}")
+
+    cached = _forest_values_cache.get(model)
+    if cached is None:
+        trees = [estimator.tree_ for estimator in model.estimators_]
+        offsets = np.concatenate([[0], np.cumsum([tree.node_count for tree in trees])[:-1]])
+        values = np.concatenate([tree.value[:, 0, 0] for tree in trees])
+        cached = (values, offsets)
+        _forest_values_cache[model] = cached
+    values, offsets = cached
+    # apply() returns the leaf index of every row in every tree in one call
+    leaves = model.apply(X)
+    return values[(leaves + offsets).T]
+
+
+def predict_with_intervals(model, X: np.ndarray,
+                           quantiles: Sequence[float]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Forest prediction with the given lower/upper quantiles of the individual
+    tree outputs. The prediction equals model.predict(X).
+    """
+    values = tree_values(model, X)
+    lower, upper = np.quantile(values, quantiles, axis=0)
+    return forest_mean(values), lower, upper
+
+
+def feature_contributions(model, X: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (bias, contributions) tree-path attributions of a random forest over a
+    whole batch; see FlatEnsemble.contributions. sklearn forests are compiled
+    once and the compiled copy is reused.
+    """
+    if not supports_intervals(model):
+        raise TypeError(f"Feature attributions are not available for {type(model).__name__}")
+    if not isinstance(model, FlatEnsemble):
+        flat = _flat_cache.get(model)
+        if flat is None:
+            flat = flatten(model)
+            _flat_cache[model] = flat
+        model = flat
+    return model.contributions(X)
+
+
+def _tree_list(model):
+    if _is_sklearn(model, "RandomForestRegressor"):
+        return list(model.estimators_)
+    if _is_sklearn(model, "GradientBoostingClassifier"):
+        return [tree for stage in model.estimators_ for tree in stage]
+    raise TypeError(f"Unsupported model type: {type(model).__name__}")
+
+
+def supports(model) -> bool:
+    """Whether a fitted model can be stored as a FlatEnsemble"""
+    if _is_sklearn(model, "RandomForestRegressor"):
+        return hasattr(model, "estimators_") and model.n_outputs_ == 1
+    if _is_sklearn(model, "GradientBoostingClassifier"):
+        if not hasattr(model, "estimators_"):
+            return False
+        # Only constant initial predictions can be folded into init_raw
+        return isinstance(model.init_, str) or type(model.init_).__name__ == "DummyClassifier"
+    return False
+
+
+def flatten(model) -> FlatEnsemble:
+    """Compile a fitted sklearn ensemble into concatenated node arrays"""
+    trees = [estimator.tree_ for estimator in _tree_list(model)]
+    sizes = np.array([tree.node_count for tree in trees])
+    roots = np.concatenate([[0], np.cumsum(sizes)[:-1]]).astype(np.int32)
+
+    if sizes.sum() >= 2**31:
+        raise ValueError("Ensemble too large for int32 node indices")
+    children = np.concatenate([
+        np.column_stack([tree.children_right, tree.children_left]).astype(np.int32) + root
+        for root, tree in zip(roots, trees)
+    ])
+    feature = np.concatenate([tree.feature for tree in trees]).astype(np.int32)
+    # Leaf children are never followed; point them back at the leaf itself
+    is_leaf = feature < 0
+    feature[is_leaf] = LEAF_FEATURE
+    children[is_leaf] = np.flatnonzero(is_leaf)[:, None]
+
+    arrays = {
+        "feature": feature,
+        "threshold": np.concatenate([tree.threshold for tree in trees]).astype(np.float64),
+        "children": children,
+        "value": np.concatenate([tree.value[:, 0, 0] for tree in trees]).astype(np.float64),
+        "roots": roots,
+        # Trees from sklearn < 1.3 carry no missing-value direction
+        "missing_left": np.concatenate([
+            np.asarray(getattr(tree, "missing_go_to_left", np.zeros(tree.node_count)), dtype=bool)
+            for tree in trees
+        ]) & ~is_leaf,
+    }
+
+    meta = {
+        "layout_version": LAYOUT_VERSION,
+        "estimator": type(model).__name__,
+        "n_features": int(model.n_features_in_),
+        "n_trees": len(trees),
+        "max_depth": int(max(tree.max_depth for tree in trees)),
+    }
+    if _is_sklearn(model, "GradientBoostingClassifier"):
+        init_raw = model._raw_predict_init(np.zeros((1, model.n_features_in_), dtype=np.float32))[0]
+        meta.update({
+            "kind": "gradient_boosting_classifier",
+            "classes": model.classes_.tolist(),
+            "learning_rate": float(model.learning_rate),
+            "init_raw": init_raw.tolist(),
+            "n_trees_per_stage": int(model.estimators_.shape[1]),
+        })
+    else:
+        meta["kind"] = "random_forest_regressor"
+
+    from sklearn.base import clone
+    return FlatEnsemble(arrays, meta, estimator=clone(model))
+
+
+def arrays_dir(model_path: str, name: str, precision: str = "float64") -> str:
+    if precision == "float64":
+        return f"{model_path}/{name}_arrays"
+    return f"{model_path}/{name}_arrays_{precision}"
+
+
+@contextmanager
+def arrays_lock(model_path: str, name: str, precision: str = "float64"):
+    """
+    Exclusive lock on a stored ensemble's arrays, taken on a
+    <name>_arrays.lock file next to them so that replicas sharing the model
+    volume convert and swap one at a time.
+    """
+    import fcntl
+
+    with open(f"{arrays_dir(model_path, name, precision)}.lock", "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def save_flat(model_path: str, name: str, flat: FlatEnsemble):
+    """
+    Write a FlatEnsemble as .npy files, replacing the previous directory
+    atomically. Callers hold arrays_lock for the same name and precision.
+    """
+    import joblib
+
+    target = arrays_dir(model_path, name, flat.precision)
+    tmp_dir = f"{target}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    for array_name in ARRAY_NAMES:
+        np.save(f"{tmp_dir}/{array_name}.npy", np.ascontiguousarray(getattr(flat, array_name)))
+    joblib.dump(flat.estimator, f"{tmp_dir}/estimator.pkl")
+    with open(f"{tmp_dir}/meta.json", "w") as f:
+        json.dump(flat.meta, f)
+
+    # Swap directories: rename the old one aside, move the new one in
+    old_dir = f"{target}.old-{os.getpid()}"
+    if os.path.exists(target):
+        os.replace(target, old_dir)
+    os.replace(tmp_dir, target)
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+
+def load_flat(model_path: str, name: str, mmap_mode: Optional[str] = "r",
+              precision: str = "float64") -> Optional[FlatEnsemble]:
+    """Memory-map a stored FlatEnsemble; returns None if none is stored"""
+    import joblib
+
+    directory = arrays_dir(model_path, name, precision)
+    if not os.path.exists(f"{directory}/meta.json"):
+        return None
+    with open(f"{directory}/meta.json") as f:
+        meta = json.load(f)
+    if meta.get("layout_version") != LAYOUT_VERSION:
+        return None
+    arrays = {
+        array_name: np.load(f"{directory}/{array_name}.npy", mmap_mode=mmap_mode)
+        for array_name in ARRAY_NAMES
+    }
+    estimator = joblib.load(f"{directory}/estimator.pkl")
+    return FlatEnsemble(arrays, meta, estimator=estimator)
+
+
+def fresh_estimator(model):
+    """Unfitted copy of a served model, whether sklearn or FlatEnsemble"""
+    if isinstance(model, FlatEnsemble):
+        return model.make_estimator()
+    from sklearn.base import clone
+    return clone(model)
+
+
+def memory_usage() -> Dict[str, int]:
+    """Resident memory of this process in bytes, split into anonymous and file-backed pages"""
+    usage = {}
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                key, _, rest = line.partition(":")
+                if key in ("VmRSS", "RssAnon", "RssFile", "RssShmem"):
+                    usage[key] = int(rest.split()[0]) * 1024
+    except OSError:
+        pass
+    return usage
+
+
+# Benchmark against sklearn
+if __name__ == "__main__":
+    import time
+
+    from sklearn.ensemble import GradientBoostingClassifier, RandomForestRegressor
+
+    rng = np.random.default_rng(42)
+    X_train = rng.normal(size=(5000, 9))
+    y_train = X_train[:, 0] * 3 + X_train[:, 1] ** 2 + rng.normal(size=5000)
+
+    estimators = [
+        ("RandomForestRegressor", RandomForestRegressor(n_estimators=100, random_state=42).fit(X_train, y_train)),
+        ("GradientBoostingClassifier", GradientBoostingClassifier(n_estimators=100, random_state=42).fit(
+            X_train, (y_train > np.median(y_train)).astype(int))),
+    ]
+
+    def timed(fn, X, min_seconds=0.5):
+        fn(X)
+        runs, start = 0, time.perf_counter()
+        while time.perf_counter() - start < min_seconds:
+            fn(X)
+            runs += 1
+        return (time.perf_counter() - start) / runs
+
+    def rejects(fn, X):
+        try:
+            fn(X)
+        except ValueError:
+            return True
+        return False
+
+    for name, model in estimators:
+        flat = flatten(model)
+        predict = model.predict if name == "RandomForestRegressor" else model.predict_proba
+        predict_flat = flat.predict if name == "RandomForestRegressor" else flat.predict_proba
+
+        X_check = rng.normal(size=(20000, 9))
+        identical = np.array_equal(predict(X_check), predict_flat(X_check))
+        # With NaN inputs forests follow each split's missing-value direction; gradient boosting rejects them
+        X_missing = X_check.copy()
+        X_missing[rng.random(X_missing.shape) < 0.1] = np.nan
+        if name == "RandomForestRegressor":
+            identical_missing = np.array_equal(predict(X_missing), predict_flat(X_missing))
+        else:
+            identical_missing = rejects(predict, X_missing) and rejects(predict_flat, X_missing)
+        print(f"{name}: {flat.n_trees} trees, {len(flat.value)} nodes, "
+              f"{flat.nbytes / 2**20:.1f} MiB, bit-identical: {identical}, with NaN: {identical_missing}")
+        print(f"  {'batch':>6} {'sklearn ms':>11} {'compiled ms':>12} {'speedup':>8} {'compiled rows/s':>16}")
+        for batch in [1, 16, 64, 256, 1024, 4096]:
+            X = rng.normal(size=(batch, 9))
+            sklearn_time = timed(predict, X)
+            flat_time = timed(predict_flat, X)
+            print(f"  {batch:>6} {sklearn_time * 1000:>11.2f} {flat_time * 1000:>12.2f} "
+                  f"{sklearn_time / flat_time:>7.1f}x {batch / flat_time:>16,.0f}")
+
+        if name == "RandomForestRegressor":
+            print("  Prediction intervals (5%-95% of tree outputs), compiled backend:")
+            print(f"  {'batch':>6} {'predict ms':>11} {'intervals ms':>13} {'ratio':>6}")
+            for batch in [1, 64, 1024]:
+                X = rng.normal(size=(batch, 9))
+                predict_time = timed(flat.predict, X)
+                interval_time = timed(lambda X: predict_with_intervals(flat, X, (0.05, 0.95)), X)
+                print(f"  {batch:>6} {predict_time * 1000:>11.2f} {interval_time * 1000:>13.2f} "
+                      f"{interval_time / predict_time:>5.2f}x")
+
+            print("  Tree-path feature attributions, compiled backend:")
+            print(f"  {'batch':>6} {'predict ms':>11} {'attribution ms':>15} {'ratio':>6} {'max |residual|':>15}")
+            for batch in [1, 64, 1024]:
+                X = rng.normal(size=(batch, 9))
+                predict_time = timed(flat.predict, X)
+                attribution_time = timed(flat.contributions, X)
+                bias, contributions = flat.contributions(X)
+                residual = np.abs(bias + contributions.sum(axis=1) - flat.predict(X)).max()
+                print(f"  {batch:>6} {predict_time * 1000:>11.2f} {attribution_time * 1000:>15.2f} "
+                      f"{attribution_time / predict_time:>5.2f}x {residual:>15.2e}")
+
+        reduced = flat.to_float32()
+        X_holdout = rng.normal(size=(5000, 9))
+        report = compare_precision(flat, reduced, X_holdout, tolerance=1e-5)
+        boundary = compare_precision(flat, reduced, probe_inputs(flat), tolerance=1e-5)
+        X = rng.normal(size=(1024, 9))
+        print(f"  float32 node arrays: {report['reduced_bytes'] / 2**20:.1f} MiB "
+              f"({report['saved_fraction']:.0%} smaller), max relative error "
+              f"{report['max_rel_error']:.1e} on holdout, {boundary['max_rel_error']:.1e} on split boundaries, "
+              f"passed: {report['passed'] and boundary['passed']}, "
+              f"batch 1024 {timed(predict_flat, X) * 1000:.2f} ms -> "
+              f"{timed(reduced.predict if name == 'RandomForestRegressor' else reduced.predict_proba, X) * 1000:.2f} ms")
@@ -0,0 +1,116 @@
+"""
+Model Hot Reload
+Watches the model directory and swaps in bundles written by other processes or deploys
+"""
+
+import asyncio
+import os
+import time
+import logging
+from typing import Awaitable, Callable, Dict, Optional, Sequence, Tuple
+
+from model_registry import manifest_signature
+
+logger = logging.getLogger(__name__)
+
+
+class ModelWatcher:
+    """
+    Polls each model's {name}_meta.json manifest and reloads the model when
+    the manifest changes.
+
+    reload is an async callable that loads, warms and publishes the bundle
+    of one model and returns the published version, or None if the bundle on
+    disk is the one already served (e.g. it was just trained in process).
+    Failed reloads are logged and the manifest is not retried until it
+    changes again, so a broken artifact never replaces a working model.
+    """
+
+    def __init__(self, model_path: str, names: Sequence[str],
+                 reload: Callable[[str], Awaitable[Optional[str]]], interval: float = 5.0):
+        self.model_path = model_path
+        self.names = list(names)
+        self.reload = reload
+        self.interval = interval
+        self._signatures: Dict[str, Optional[Tuple[int, int, int]]] = {}
+        self._lock = asyncio.Lock()
+
+        # Metrics
+        self.checks = 0
+        self.reloads = 0
+        self.failures = 0
+        self.last_reload: Optional[Dict] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.interval > 0
+
+    def snapshot(self):
+        """Record the manifests as they are now; call before the initial load"""
+        for name in self.names:
+            self._signatures[name] = manifest_signature(self.model_path, name)
+
+    async def check(self) -> Dict[str, str]:
+        """Reload every model whose manifest changed; returns {name: new version}"""
+        reloaded = {}
+        async with self._lock:
+            self.checks += 1
+            for name in self.names:
+                signature = manifest_signature(self.model_path, name)
+                if signature is None or signature == self._signatures.get(name):
+                    continue
+                self._signatures[name] = signature
+                started = time.perf_counter()
+                try:
+                    version = await self.reload(name)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    self.failures += 1
+                    logger.error(f"Hot reload of {name} model failed, keeping the active version: {str(e)}")
+                    continue
+                if version is None:
+                    continue
+                self.reloads += 1
+                reloaded[name] = version
+                self.last_reload = {
+                    "model": name,
+                    "version": version,
+                    "seconds": time.perf_counter() - started,
+                    "at": time.time(),
+                }
+                logger.info(f"Hot reloaded {name} model {version} in {self.last_reload['seconds']:.3f}s")
+        return reloaded
+
+    async def run(self):
+        """Poll until cancelled"""
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.check()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Model watch failed: {str(e)}")
+
+    def stats(self) -> Dict:
+        return {
+            "enabled": self.enabled,
+            "interval_seconds": self.interval,
+            "checks": self.checks,
+            "reloads": self.reloads,
+            "failures": self.failures,
+            "last_reload": self.last_reload,
+        }
+
+
+def watcher_from_env(model_path: str, names: Sequence[str],
+                     reload: Callable[[str], Awaitable[Optional[str]]]) -> ModelWatcher:
+    """
+    Build a ModelWatcher polling every ML_MODEL_WATCH_INTERVAL seconds;
+    an interval of 0 disables watching.
+    """
+    return ModelWatcher(
+        model_path, names, reload,
+        interval=float(os.getenv("ML_MODEL_WATCH_INTERVAL", "5")),
+    )
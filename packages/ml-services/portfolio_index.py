@@ -0,0 +1,161 @@
+"""
+SPV Portfolio Index
+In-memory per-SPV valuation aggregates maintained incrementally as properties change
+"""
+
+import threading
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class PropertyValuation:
+    """Latest valuation of one property and the data it was computed from"""
+    property_id: str
+    property_data: dict
+    value: float
+    lower_ci: float
+    upper_ci: float
+    confidence: float
+    revision: int
+
+
+class SPVAggregate:
+    """
+    Running totals over an SPV's property valuations.
+
+    Totals are adjusted by the difference whenever one property is added,
+    revalued or removed, so reading them never touches the properties. The
+    portfolio interval is the sum of the per-property bounds, which assumes
+    fully correlated errors and is therefore conservative.
+    """
+
+    def __init__(self, spv_id: str, model_version: str):
+        self.spv_id = spv_id
+        self.model_version = model_version
+        self.properties: Dict[str, PropertyValuation] = {}
+        self.value = 0.0
+        self.lower_ci = 0.0
+        self.upper_ci = 0.0
+        self.weighted_confidence = 0.0
+        self.updated_at = datetime.now()
+
+    def _apply(self, valuation: PropertyValuation, sign: float):
+        self.value += sign * valuation.value
+        self.lower_ci += sign * valuation.lower_ci
+        self.upper_ci += sign * valuation.upper_ci
+        self.weighted_confidence += sign * valuation.confidence * valuation.value
+
+    def put(self, valuation: PropertyValuation):
+        previous = self.properties.get(valuation.property_id)
+        if previous is not None:
+            self._apply(previous, -1.0)
+        self.properties[valuation.property_id] = valuation
+        self._apply(valuation, 1.0)
+        self.updated_at = datetime.now()
+
+    def remove(self, property_id: str) -> bool:
+        previous = self.properties.pop(property_id, None)
+        if previous is None:
+            return False
+        self._apply(previous, -1.0)
+        if not self.properties:
+            # Reset exactly rather than leaving rounding residue behind
+            self.value = self.lower_ci = self.upper_ci = self.weighted_confidence = 0.0
+        self.updated_at = datetime.now()
+        return True
+
+    def summary(self) -> Dict:
+        return {
+            "spv_id": self.spv_id,
+            "value": self.value,
+            "lower_ci": self.lower_ci,
+            "upper_ci": self.upper_ci,
+            "confidence": self.weighted_confidence / self.value if self.value else 0.0,
+            "properties_count": len(self.properties),
+            "model_version": self.model_version,
+            "updated_at": self.updated_at.isoformat(),
+        }
+
+
+class PortfolioIndex:
+    """
+    Per-SPV valuation aggregates keyed by SPV id.
+
+    Writers take a revision from next_revision() before valuing properties
+    and pass it along with the results; a result older than what the index
+    already holds for a property is discarded, so a slow valuation can never
+    overwrite a newer one.
+    """
+
+    def __init__(self):
+        self._spvs: Dict[str, SPVAggregate] = {}
+        self._lock = threading.Lock()
+        self._revision = 0
+
+    def next_revision(self) -> int:
+        with self._lock:
+            self._revision += 1
+            return self._revision
+
+    def get(self, spv_id: str) -> Optional[SPVAggregate]:
+        return self._spvs.get(spv_id)
+
+    def update(self, spv_id: str, valuations: List[PropertyValuation], model_version: str,
+               revalued: bool = False) -> SPVAggregate:
+        """
+        Add or revalue properties of an SPV, adjusting its totals by the
+        difference. revalued marks a full revaluation under model_version.
+        """
+        with self._lock:
+            aggregate = self._spvs.get(spv_id)
+            if aggregate is None:
+                aggregate = self._spvs[spv_id] = SPVAggregate(spv_id, model_version)
+            for valuation in valuations:
+                current = aggregate.properties.get(valuation.property_id)
+                if current is None:
+                    # A revaluation must not bring back a property removed meanwhile
+                    if not revalued:
+                        aggregate.put(valuation)
+                elif current.revision <= valuation.revision:
+                    aggregate.put(valuation)
+            if revalued:
+                aggregate.model_version = model_version
+            return aggregate
+
+    def replace(self, spv_id: str, valuations: List[PropertyValuation], model_version: str,
+                revision: int) -> SPVAggregate:
+        """
+        Replace an SPV's whole portfolio. Single-property updates issued after
+        revision that landed first are kept.
+        """
+        with self._lock:
+            aggregate = SPVAggregate(spv_id, model_version)
+            for valuation in valuations:
+                aggregate.put(valuation)
+            previous = self._spvs.get(spv_id)
+            if previous is not None:
+                for valuation in previous.properties.values():
+                    if valuation.revision > revision:
+                        aggregate.put(valuation)
+            self._spvs[spv_id] = aggregate
+            return aggregate
+
+    def remove_property(self, spv_id: str, property_id: str) -> bool:
+        with self._lock:
+            aggregate = self._spvs.get(spv_id)
+            return aggregate is not None and aggregate.remove(property_id)
+
+    def remove_spv(self, spv_id: str) -> bool:
+        with self._lock:
+            return self._spvs.pop(spv_id, None) is not None
+
+    def stats(self) -> Dict:
+        return {
+            "spvs": len(self._spvs),
+            "properties": sum(len(a.properties) for a in self._spvs.values()),
+        }
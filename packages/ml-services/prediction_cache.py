@@ -0,0 +1,147 @@
+"""
+Prediction Result Cache
+LRU + TTL cache of model results keyed by canonical payload hash and model version
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def canonical_hash(payload: Any) -> str:
+    """
+    Hash a JSON-like payload independently of dict key order and whitespace,
+    so equal payloads sent by different clients share a cache entry.
+    """
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.blake2b(encoded.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def row_hash(row: np.ndarray) -> str:
+    """Hash of a feature row's exact float64 values"""
+    row = np.ascontiguousarray(row, dtype=np.float64)
+    return hashlib.blake2b(row.tobytes(), digest_size=16).hexdigest()
+
+
+class PredictionCache:
+    """
+    Bounded LRU cache with a per-entry time to live.
+
+    Entries are keyed by (model name, model version, payload hash). Including
+    the version means a newly published model can never be served a stale
+    result; invalidate() additionally frees the old version's entries at once
+    instead of waiting for them to age out. At most max_entries results are
+    held, so memory is bounded by max_entries times the largest response.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 60.0):
+        self.max_entries = max(0, max_entries)
+        self.ttl = ttl_seconds
+        self._entries: "OrderedDict[Tuple[str, str, str], Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl > 0
+
+    def get(self, name: str, version: str, digest: str) -> Optional[Any]:
+        """Return the cached result or None, counting a hit or miss"""
+        if not self.enabled:
+            return None
+        key = (name, version, digest)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+                self.expirations += 1
+            self.misses += 1
+            return None
+
+    def put(self, name: str, version: str, digest: str, value: Any):
+        if not self.enabled:
+            return
+        key = (name, version, digest)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, name: str) -> int:
+        """Drop every entry of a model, e.g. after a new version is published"""
+        with self._lock:
+            stale = [key for key in self._entries if key[0] == name]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += len(stale)
+        if stale:
+            logger.info(f"Invalidated {len(stale)} cached {name} entries")
+        return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
+
+
+def cache_from_env(prefix: str, max_entries: int = 10000, ttl_seconds: float = 60.0) -> PredictionCache:
+    """
+    Build a PredictionCache configured by {prefix}_SIZE and {prefix}_TTL
+    (seconds) environment variables; a size or TTL of 0 disables caching.
+    """
+    return PredictionCache(
+        max_entries=int(os.getenv(f"{prefix}_SIZE", max_entries)),
+        ttl_seconds=float(os.getenv(f"{prefix}_TTL", ttl_seconds)),
+    )
+
+
+if __name__ == "__main__":
+    # Example usage
+    cache = PredictionCache(max_entries=2, ttl_seconds=60.0)
+    payload = {"area": 120, "location": {"lat": 40.7, "lon": -74.0}}
+    digest = canonical_hash(payload)
+    assert digest == canonical_hash({"location": {"lon": -74.0, "lat": 40.7}, "area": 120})
+
+    print(cache.get("avm", "v1", digest))
+    cache.put("avm", "v1", digest, {"value": 512000.0})
+    print(cache.get("avm", "v1", digest))
+    print(cache.get("avm", "v2", digest))
+    cache.invalidate("avm")
+    print(cache.stats())
@@ -0,0 +1,160 @@
+"""
+Response Encoding
+Content negotiation and fast JSON, MessagePack and Arrow IPC encoders for batch results
+"""
+
+import importlib.util
+import json
+import logging
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from fastapi.responses import JSONResponse
+
+from metrics import TimedJSONResponse
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional encoding
+    msgpack = None
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+# Other names clients send for the same encodings
+MEDIA_TYPE_ALIASES = {
+    "application/x-msgpack": MSGPACK_MEDIA_TYPE,
+    "application/vnd.msgpack": MSGPACK_MEDIA_TYPE,
+}
+
+# Encodings offered by batch endpoints, most preferred first; JSON is always available
+BATCH_MEDIA_TYPES = [JSON_MEDIA_TYPE]
+if msgpack is not None:
+    BATCH_MEDIA_TYPES.append(MSGPACK_MEDIA_TYPE)
+if importlib.util.find_spec("pyarrow") is not None:
+    BATCH_MEDIA_TYPES.append(ARROW_MEDIA_TYPE)
+
+# Arrow lookup tables, built once per source table
+_arrow_tables: Dict[int, Any] = {}
+
+
+def negotiate(accept: Optional[str], offered: Sequence[str]) -> Optional[str]:
+    """
+    The offered media type the Accept header prefers, by q-value and then
+    by specificity; offered[0] when the header is absent or a wildcard wins.
+    None when nothing offered is acceptable (a 406).
+    """
+    if not accept:
+        return offered[0]
+    best, best_rank = None, (0.0, -1)
+    for part in accept.split(","):
+        media_type, _, params = part.partition(";")
+        media_type = media_type.strip().lower()
+        media_type = MEDIA_TYPE_ALIASES.get(media_type, media_type)
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.partition("=")
+            if key.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if media_type in offered:
+            candidate, specificity = media_type, 2
+        elif media_type in ("*/*", "application/*"):
+            candidate, specificity = offered[0], 0 if media_type == "*/*" else 1
+        else:
+            continue
+        if q > 0 and (q, specificity) > best_rank:
+            best, best_rank = candidate, (q, specificity)
+    return best
+
+
+def dumps_json(content) -> bytes:
+    """JSON bytes, encoded with orjson when it is installed"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            pass  # types orjson does not know; the stdlib encoder reports them
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def encode(content, media_type: str) -> bytes:
+    """Encode plain Python content as JSON or MessagePack"""
+    if media_type == MSGPACK_MEDIA_TYPE:
+        return msgpack.packb(content, use_bin_type=True)
+    return dumps_json(content)
+
+
+class _FastJSONRender(JSONResponse):
+    def render(self, content) -> bytes:
+        return dumps_json(content)
+
+
+class FastJSONResponse(TimedJSONResponse, _FastJSONRender):
+    """TimedJSONResponse rendered with dumps_json; encoding time is still recorded"""
+
+
+def masked(values: np.ndarray, valid: np.ndarray):
+    """Arrow array of values with nulls where valid is False; no per-item objects"""
+    import pyarrow as pa
+
+    return pa.array(values, mask=~valid)
+
+
+def lookup(table: List, codes: np.ndarray, valid: np.ndarray):
+    """
+    Arrow array of table[code] per row (null where not valid), gathered with
+    Arrow's take from a table converted once, so nested values such as
+    factor lists are never rebuilt per row.
+    """
+    import pyarrow as pa
+
+    values = _arrow_tables.get(id(table))
+    if values is None:
+        values = _arrow_tables[id(table)] = pa.array(table)
+    return values.take(pa.array(codes, mask=~valid))
+
+
+def arrow_ipc(columns: Dict[str, Any], metadata: Dict[str, str]) -> bytes:
+    """One record batch of the given columns as an Arrow IPC stream"""
+    import pyarrow as pa
+
+    batch = pa.RecordBatch.from_pydict(
+        {name: column if isinstance(column, (pa.Array, pa.ChunkedArray)) else pa.array(column)
+         for name, column in columns.items()},
+        metadata=metadata,
+    )
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, batch.schema) as writer:
+        writer.write_batch(batch)
+    return sink.getvalue().to_pybytes()
+
+
+# Example usage
+if __name__ == "__main__":
+    import time
+
+    n = 50_000
+    rng = np.random.default_rng(0)
+    content = {
+        "model_version": "v2.3.1",
+        "results": [
+            {"index": i, "spv_id": f"spv-{i}", "value": v, "lower_ci": v * 0.9, "upper_ci": v * 1.1, "error": None}
+            for i, v in enumerate(rng.uniform(1e5, 1e7, n).tolist())
+        ],
+    }
+    for name, render in (("json", lambda c: json.dumps(c).encode()), ("fast json", dumps_json)):
+        start = time.perf_counter()
+        body = render(content)
+        print(f"{name}: {len(body) / 1e6:.1f}MB in {(time.perf_counter() - start) * 1000:.1f}ms")
+    print(negotiate("application/msgpack;q=0.9, application/json;q=0.5", BATCH_MEDIA_TYPES))
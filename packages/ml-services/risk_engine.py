@@ -0,0 +1,237 @@
+"""
+Vectorized Risk Scoring Engine
+Scores many SPVs at once with NumPy array operations
+"""
+
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Risk inputs and their defaults, in feature matrix column order
+RISK_FEATURE_DEFAULTS = {
+    'rent_delinquency_rate': 0.05,
+    'market_volatility': 0.15,
+    'maintenance_cost_ratio': 0.10,
+    'occupancy_rate': 0.85,
+    'debt_service_coverage': 1.5,
+}
+RISK_FEATURES = list(RISK_FEATURE_DEFAULTS)
+
+# Bucket tables indexed by risk level (LOW, MEDIUM, HIGH)
+RISK_LEVELS = np.array(['LOW', 'MEDIUM', 'HIGH'])
+RISK_LEVEL_BOUNDS = np.array([30, 60])
+DEFAULT_PROBABILITIES = np.array([0.02, 0.08, 0.20])
+SUGGESTED_LTVS = np.array([0.75, 0.60, 0.45])
+
+RECOMMENDATIONS = [
+    "Improve rent collection processes",
+    "Focus on tenant retention and acquisition",
+    "Consider refinancing to improve cash flow",
+    "Diversify property portfolio",
+    "Excellent risk profile - consider expansion",
+]
+
+# (name, weight, label when flag is set, label otherwise)
+RISK_FACTORS = [
+    ('rent_delinquency', 0.4, 'low', 'high'),
+    ('market_volatility', 0.3, 'low', 'high'),
+    ('maintenance_cost', 0.2, 'low', 'high'),
+    ('occupancy', 0.1, 'high', 'low'),
+]
+
+RISK_LEVEL_NAMES = RISK_LEVELS.tolist()
+DEFAULT_PROBABILITY_VALUES = DEFAULT_PROBABILITIES.tolist()
+SUGGESTED_LTV_VALUES = SUGGESTED_LTVS.tolist()
+
+# Factor and recommendation outputs precomputed for every flag combination,
+# indexed by the flags packed into an integer code
+FACTOR_BITS = 1 << np.arange(len(RISK_FACTORS))
+RECOMMENDATION_BITS = 1 << np.arange(len(RECOMMENDATIONS))
+FACTOR_TABLE = [
+    [
+        {'name': name, 'weight': weight, 'value': on if code & (1 << j) else off}
+        for j, (name, weight, on, off) in enumerate(RISK_FACTORS)
+    ]
+    for code in range(1 << len(RISK_FACTORS))
+]
+RECOMMENDATION_TABLE = [
+    [text for j, text in enumerate(RECOMMENDATIONS) if code & (1 << j)]
+    for code in range(1 << len(RECOMMENDATIONS))
+]
+
+
+class RiskScores:
+    """Array-valued risk scoring results for a batch of SPVs"""
+
+    def __init__(self, scores: np.ndarray, levels: np.ndarray,
+                 factor_flags: np.ndarray, recommendation_mask: np.ndarray):
+        self.scores = scores
+        self.levels = levels
+        self.factor_flags = factor_flags
+        self.recommendation_mask = recommendation_mask
+
+    def __len__(self) -> int:
+        return len(self.scores)
+
+    @property
+    def risk_scores(self) -> np.ndarray:
+        """Integer risk scores, truncated like the single-item endpoint"""
+        return self.scores.astype(np.int64)
+
+    @property
+    def risk_levels(self) -> np.ndarray:
+        return RISK_LEVELS[self.levels]
+
+    @property
+    def default_probabilities(self) -> np.ndarray:
+        return DEFAULT_PROBABILITIES[self.levels]
+
+    @property
+    def suggested_ltvs(self) -> np.ndarray:
+        return SUGGESTED_LTVS[self.levels]
+
+    @property
+    def factor_codes(self) -> np.ndarray:
+        """Row indices into FACTOR_TABLE"""
+        return self.factor_flags @ FACTOR_BITS
+
+    @property
+    def recommendation_codes(self) -> np.ndarray:
+        """Row indices into RECOMMENDATION_TABLE"""
+        return self.recommendation_mask @ RECOMMENDATION_BITS
+
+    def to_dicts(self) -> List[Dict]:
+        """
+        Per-item results in the RiskScoreResponse shape.
+        The factors and recommendations lists are shared between items and
+        must be treated as read-only.
+        """
+        return [
+            {
+                'risk_score': score,
+                'risk_level': RISK_LEVEL_NAMES[level],
+                'default_probability': DEFAULT_PROBABILITY_VALUES[level],
+                'suggested_ltv': SUGGESTED_LTV_VALUES[level],
+                'factors': FACTOR_TABLE[factor_code],
+                'recommendations': RECOMMENDATION_TABLE[recommendation_code],
+            }
+            for score, level, factor_code, recommendation_code in zip(
+                self.risk_scores.tolist(),
+                self.levels.tolist(),
+                self.factor_codes.tolist(),
+                self.recommendation_codes.tolist(),
+            )
+        ]
+
+
+def extract_risk_features_batch(features_list: List[Dict]) -> Tuple[np.ndarray, List[Optional[str]]]:
+    """
+    Build an (N, 5) float64 risk feature matrix, applying the same defaults as
+    the single-item endpoint. Invalid rows are NaN and reported in errors.
+    """
+    errors: List[Optional[str]] = [None] * len(features_list)
+    defaults = list(RISK_FEATURE_DEFAULTS.items())
+    rows = []
+    for i, features in enumerate(features_list):
+        try:
+            rows.append([features.get(name, default) for name, default in defaults])
+        except Exception as e:
+            errors[i] = f"Invalid features: {e}"
+            rows.append([np.nan] * len(defaults))
+
+    try:
+        X = np.array(rows, dtype=np.float64).reshape(len(rows), len(defaults))
+    except (TypeError, ValueError, OverflowError):
+        X = np.full((len(rows), len(defaults)), np.nan)
+        for i, row in enumerate(rows):
+            try:
+                X[i] = np.array(row, dtype=np.float64)
+            except (TypeError, ValueError, OverflowError) as e:
+                errors[i] = f"Invalid features: {e}"
+
+    bad_rows = ~np.isfinite(X).all(axis=1)
+    for i in np.flatnonzero(bad_rows):
+        if errors[i] is None:
+            errors[i] = "Invalid features: values must be finite numbers"
+    return X, errors
+
+
+def weighted_risk_scores(rent_delinquency, market_volatility, maintenance_cost_ratio,
+                         occupancy_rate, debt_service_coverage) -> np.ndarray:
+    """
+    Clipped float risk scores (0-100). Inputs may be any mutually
+    broadcastable arrays or scalars. Mirrors calculate_risk_score in main.py
+    operation for operation so that results are identical to the
+    single-item endpoint.
+    """
+    # Weighted risk score (0-100)
+    scores = (
+        rent_delinquency * 40 +
+        market_volatility * 30 +
+        maintenance_cost_ratio * 20 +
+        (1 - occupancy_rate) * 10
+    ) * 100
+
+    # Adjust for debt service coverage
+    scores = np.where(debt_service_coverage < 1.2, scores + 15, scores)
+    scores = np.where(debt_service_coverage > 2.0, scores - 10, scores)
+    return np.clip(scores, 0, 100)
+
+
+def score_risk_batch(X: np.ndarray) -> RiskScores:
+    """Score an (N, 5) risk feature matrix"""
+    rent_delinquency = X[:, 0]
+    market_volatility = X[:, 1]
+    maintenance_cost_ratio = X[:, 2]
+    occupancy_rate = X[:, 3]
+    debt_service_coverage = X[:, 4]
+
+    scores = weighted_risk_scores(
+        rent_delinquency, market_volatility, maintenance_cost_ratio, occupancy_rate, debt_service_coverage
+    )
+    levels = np.searchsorted(RISK_LEVEL_BOUNDS, scores, side='right')
+
+    factor_flags = np.column_stack([
+        rent_delinquency < 0.05,
+        market_volatility < 0.15,
+        maintenance_cost_ratio < 0.12,
+        occupancy_rate > 0.85,
+    ])
+    recommendation_mask = np.column_stack([
+        rent_delinquency > 0.10,
+        occupancy_rate < 0.80,
+        debt_service_coverage < 1.5,
+        market_volatility > 0.20,
+        scores < 30,
+    ])
+
+    return RiskScores(scores, levels, factor_flags, recommendation_mask)
+
+
+# Example usage
+if __name__ == "__main__":
+    import time
+
+    n = 1_000_000
+    rng = np.random.default_rng(42)
+    X = np.column_stack([
+        rng.uniform(0, 0.2, n),
+        rng.uniform(0.05, 0.3, n),
+        rng.uniform(0.05, 0.2, n),
+        rng.uniform(0.6, 1.0, n),
+        rng.uniform(0.8, 2.5, n),
+    ])
+
+    start = time.perf_counter()
+    result = score_risk_batch(X)
+    elapsed = time.perf_counter() - start
+    print(f"Scored {n} SPVs in {elapsed:.3f}s ({n / elapsed:,.0f} SPVs/s)")
+
+    features_list = [dict(zip(RISK_FEATURES, row)) for row in X[:100_000].tolist()]
+    start = time.perf_counter()
+    X_small, _ = extract_risk_features_batch(features_list)
+    items = score_risk_batch(X_small).to_dicts()
+    elapsed = time.perf_counter() - start
+    print(f"Extracted, scored and formatted {len(items)} SPVs in {elapsed:.3f}s")
@@ -0,0 +1,313 @@
+"""
+Risk Score Index
+Precomputed risk scores per SPV, batch-scored from the pipeline's feature table and updated incrementally
+"""
+
+import asyncio
+import os
+import threading
+import time
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from risk_engine import (
+    DEFAULT_PROBABILITY_VALUES, FACTOR_TABLE, RECOMMENDATION_TABLE, RISK_FEATURE_DEFAULTS, RISK_FEATURES,
+    RISK_LEVEL_NAMES, SUGGESTED_LTV_VALUES, extract_risk_features_batch, score_risk_batch
+)
+
+logger = logging.getLogger(__name__)
+
+# Columns read for each risk feature, first match wins; the pipeline writes occupancy as avg_occupancy
+FEATURE_COLUMNS = {name: (name,) for name in RISK_FEATURES}
+FEATURE_COLUMNS["occupancy_rate"] = ("occupancy_rate", "avg_occupancy")
+
+# Per-row feature timestamp written by the pipeline; the file's mtime is used when it is missing
+TIMESTAMP_COLUMN = "timestamp"
+
+
+def risk_result(score: int, level: int, factor_code: int, recommendation_code: int) -> Dict:
+    """One result in the RiskScoreResponse shape, as RiskScores.to_dicts builds it"""
+    return {
+        'risk_score': score,
+        'risk_level': RISK_LEVEL_NAMES[level],
+        'default_probability': DEFAULT_PROBABILITY_VALUES[level],
+        'suggested_ltv': SUGGESTED_LTV_VALUES[level],
+        'factors': FACTOR_TABLE[factor_code],
+        'recommendations': RECOMMENDATION_TABLE[recommendation_code],
+    }
+
+
+def read_feature_table(path: str) -> Tuple[List[str], np.ndarray, np.ndarray, int]:
+    """
+    spv_ids, the (N, 5) risk feature matrix and per-row feature times
+    (datetime64[us], naive local time like the pipeline writes) of a
+    Parquet feature table. Missing columns and null values take the
+    scoring defaults; rows without an spv_id are skipped. Also returns the
+    number of rows skipped.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+
+    names = set(pq.ParquetFile(path).schema_arrow.names)
+    if "spv_id" not in names:
+        raise ValueError(f"{path} has no spv_id column")
+    columns = {name: next((c for c in candidates if c in names), None) for name, candidates in FEATURE_COLUMNS.items()}
+    wanted = ["spv_id", *(c for c in columns.values() if c is not None)]
+    if TIMESTAMP_COLUMN in names:
+        wanted.append(TIMESTAMP_COLUMN)
+    table = pq.read_table(path, columns=wanted)
+
+    has_id = pc.is_valid(table.column("spv_id"))
+    skipped = table.num_rows - pc.sum(has_id).as_py() if table.num_rows else 0
+    if skipped:
+        table = table.filter(has_id)
+    spv_ids = [str(s) for s in table.column("spv_id").to_pylist()]
+
+    X = np.empty((table.num_rows, len(RISK_FEATURES)))
+    for j, name in enumerate(RISK_FEATURES):
+        if columns[name] is None:
+            X[:, j] = RISK_FEATURE_DEFAULTS[name]
+            continue
+        column = pc.cast(table.column(columns[name]), pa.float64())
+        X[:, j] = column.fill_null(RISK_FEATURE_DEFAULTS[name]).to_numpy()
+
+    if TIMESTAMP_COLUMN in names and pa.types.is_timestamp(table.schema.field(TIMESTAMP_COLUMN).type):
+        mtime = np.datetime64(datetime.fromtimestamp(os.stat(path).st_mtime), "us")
+        times = pc.cast(table.column(TIMESTAMP_COLUMN), pa.timestamp("us")).to_numpy(zero_copy_only=False)
+        features_at = np.where(np.isnat(times), mtime, times).astype("datetime64[us]")
+    else:
+        features_at = np.full(len(spv_ids), np.datetime64(datetime.fromtimestamp(os.stat(path).st_mtime), "us"))
+    return spv_ids, X, features_at, int(skipped)
+
+
+class RiskSnapshot:
+    """
+    Risk scores of every SPV in one feature table, held as plain lists
+    indexed through a position map, so a lookup formats one row and never
+    rescores. Later rows win for duplicate spv_ids.
+    """
+
+    def __init__(self, spv_ids: List[str], X: np.ndarray, features_at: np.ndarray, source: str):
+        finite = np.isfinite(X).all(axis=1)
+        scores = score_risk_batch(X[finite])
+        self.spv_ids = [s for s, ok in zip(spv_ids, finite.tolist()) if ok]
+        self.invalid = len(spv_ids) - len(self.spv_ids)
+        self.features_at = features_at[finite]
+        # Formatted once, so a lookup only copies strings
+        self.features_at_iso = np.datetime_as_string(self.features_at, unit="us").tolist()
+        self.scores = scores.risk_scores.tolist()
+        self.levels = scores.levels.tolist()
+        self.factor_codes = scores.factor_codes.tolist()
+        self.recommendation_codes = scores.recommendation_codes.tolist()
+        self.positions = {spv_id: i for i, spv_id in enumerate(self.spv_ids)}
+        self.source = source
+        self.scored_at = datetime.now()
+        self.scored_at_iso = self.scored_at.isoformat()
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def features_time(self, spv_id: str) -> Optional[datetime]:
+        i = self.positions.get(spv_id)
+        return None if i is None else self.features_at[i].item()
+
+    def entry(self, spv_id: str) -> Optional[Dict]:
+        i = self.positions.get(spv_id)
+        if i is None:
+            return None
+        return {
+            "spv_id": spv_id,
+            **risk_result(self.scores[i], self.levels[i], self.factor_codes[i], self.recommendation_codes[i]),
+            "features_updated_at": self.features_at_iso[i],
+            "scored_at": self.scored_at_iso,
+            "source": "pipeline",
+        }
+
+
+class RiskIndex:
+    """
+    Risk scores keyed by spv_id, served in constant time.
+
+    A snapshot batch-scores the whole pipeline feature table and is
+    rebuilt whenever the file changes (checked every interval seconds).
+    Features pushed for a single SPV are scored on arrival into an overlay
+    that takes precedence over the snapshot. A rebuild drops overlay
+    entries whose features are no newer than the SPV's row in the new
+    table, so a slow rebuild never replaces fresher pushed features and a
+    newer table supersedes older pushes.
+    """
+
+    def __init__(self, path: str, interval: float = 300.0):
+        self.path = path
+        self.interval = interval
+        self._snapshot: Optional[RiskSnapshot] = None
+        # spv_id -> (feature time, entry)
+        self._overlay: Dict[str, Tuple[datetime, Dict]] = {}
+        self._signature: Optional[Tuple[int, int]] = None
+        self._lock = threading.Lock()
+        self._rebuild_lock = threading.Lock()
+
+        # Metrics
+        self.rebuilds = 0
+        self.failures = 0
+        self.last_rebuild: Optional[Dict] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.interval > 0
+
+    def get(self, spv_id: str) -> Optional[Dict]:
+        """Indexed result of an SPV with its feature and scoring times, or None"""
+        pushed = self._overlay.get(spv_id)
+        if pushed is not None:
+            return pushed[1]
+        snapshot = self._snapshot
+        return snapshot.entry(spv_id) if snapshot is not None else None
+
+    def put(self, spv_id: str, features: Dict, features_at: Optional[datetime] = None) -> Dict:
+        """
+        Score one SPV's new features into the index. Raises ValueError for
+        features the scoring endpoint would reject.
+        """
+        X, errors = extract_risk_features_batch([features])
+        if errors[0] is not None:
+            raise ValueError(errors[0])
+        scores = score_risk_batch(X)
+        now = datetime.now()
+        if features_at is None:
+            features_at = now
+        elif features_at.tzinfo is not None:
+            # Compared with the pipeline's naive local timestamps
+            features_at = features_at.astimezone().replace(tzinfo=None)
+        entry = {
+            "spv_id": spv_id,
+            **scores.to_dicts()[0],
+            "features_updated_at": features_at.isoformat(),
+            "scored_at": now.isoformat(),
+            "source": "update",
+        }
+        with self._lock:
+            current = self._overlay.get(spv_id)
+            # Pushes arriving out of order keep the newest features
+            if current is not None and current[0] > features_at:
+                return current[1]
+            self._overlay[spv_id] = (features_at, entry)
+        return entry
+
+    def _file_signature(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def refresh(self, force: bool = False) -> bool:
+        """
+        Rebuild the snapshot if the feature table changed since the last
+        build (or force); returns True if it was rebuilt. Blocking: run it
+        off the event loop.
+        """
+        with self._rebuild_lock:
+            signature = self._file_signature()
+            if signature is None or (signature == self._signature and not force):
+                return False
+            started = time.perf_counter()
+            spv_ids, X, features_at, skipped = read_feature_table(self.path)
+            snapshot = RiskSnapshot(spv_ids, X, features_at, self.path)
+            with self._lock:
+                self._overlay = {
+                    spv_id: pushed for spv_id, pushed in self._overlay.items()
+                    if (snapshot.features_time(spv_id) or datetime.min) < pushed[0]
+                }
+                self._snapshot = snapshot
+                self._signature = signature
+            self.rebuilds += 1
+            self.last_rebuild = {
+                "spvs": len(snapshot),
+                "invalid_rows": snapshot.invalid + skipped,
+                "seconds": time.perf_counter() - started,
+                "at": snapshot.scored_at.isoformat(),
+            }
+            logger.info(f"Risk index rebuilt from {self.path}: {len(snapshot)} SPVs "
+                        f"in {self.last_rebuild['seconds']:.2f}s")
+            return True
+
+    async def run(self):
+        """Build the index now, then rebuild on change every interval until cancelled"""
+        while True:
+            try:
+                await asyncio.get_running_loop().run_in_executor(None, self.refresh)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.failures += 1
+                logger.error(f"Risk index rebuild failed, keeping the current snapshot: {str(e)}")
+            await asyncio.sleep(self.interval)
+
+    def stats(self) -> Dict:
+        snapshot = self._snapshot
+        return {
+            "enabled": self.enabled,
+            "path": self.path,
+            "interval_seconds": self.interval,
+            "spvs": len(snapshot) if snapshot is not None else 0,
+            "updated_spvs": len(self._overlay),
+            "scored_at": snapshot.scored_at.isoformat() if snapshot is not None else None,
+            "rebuilds": self.rebuilds,
+            "failures": self.failures,
+            "last_rebuild": self.last_rebuild,
+        }
+
+
+def risk_index_from_env() -> RiskIndex:
+    """
+    Build a RiskIndex over ML_RISK_INDEX_PATH (default the pipeline's
+    {DATA_OUTPUT_PATH}/spv_features.parquet), checked every
+    ML_RISK_INDEX_INTERVAL seconds (0 disables scheduled rebuilds).
+    """
+    default_path = os.path.join(os.getenv("DATA_OUTPUT_PATH", "/app/feast/data"), "spv_features.parquet")
+    return RiskIndex(
+        os.getenv("ML_RISK_INDEX_PATH", default_path),
+        interval=float(os.getenv("ML_RISK_INDEX_INTERVAL", "300")),
+    )
+
+
+# Example usage
+if __name__ == "__main__":
+    import tempfile
+
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    n = 1_000_000
+    rng = np.random.default_rng(0)
+    table = pa.table({
+        "spv_id": [f"spv-{i}" for i in range(n)],
+        "avg_occupancy": rng.uniform(0.6, 1.0, n),
+        "debt_service_coverage": rng.uniform(0.8, 2.5, n),
+        "rent_delinquency_rate": rng.uniform(0, 0.2, n),
+        "timestamp": pa.array(np.full(n, np.datetime64("2026-01-01T00:00:00", "us"))),
+    })
+    path = os.path.join(tempfile.mkdtemp(), "spv_features.parquet")
+    pq.write_table(table, path)
+
+    index = RiskIndex(path)
+    index.refresh()
+    print(f"Indexed {index.stats()['spvs']:,} SPVs in {index.last_rebuild['seconds']:.2f}s")
+
+    ids = [f"spv-{i}" for i in rng.integers(0, n, 100_000).tolist()]
+    start = time.perf_counter()
+    for spv_id in ids:
+        index.get(spv_id)
+    elapsed = time.perf_counter() - start
+    print(f"{len(ids):,} lookups in {elapsed * 1000:.0f}ms ({elapsed / len(ids) * 1e6:.2f}us each)")
+
+    # Pushed features win over the table until a newer table arrives
+    index.put("spv-1", {"occupancy_rate": 0.5})
+    assert index.get("spv-1")["source"] == "update"
+    index.refresh(force=True)
+    assert index.get("spv-1")["source"] == "update"
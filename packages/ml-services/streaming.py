@@ -0,0 +1,148 @@
+"""
+Streaming NDJSON Scoring
+Reads NDJSON records from a request body incrementally and streams scored NDJSON back
+"""
+
+import json
+import os
+import logging
+from typing import AsyncIterator, Awaitable, Callable, List, Optional, Tuple
+
+from starlette.requests import ClientDisconnect
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+from metrics import mark_streaming
+
+logger = logging.getLogger(__name__)
+
+# Records scored per model call
+STREAM_CHUNK_SIZE = int(os.getenv("ML_STREAM_CHUNK_SIZE", "1000"))
+
+# Longest accepted input line; longer lines are skipped and reported as errors
+STREAM_MAX_LINE_BYTES = int(os.getenv("ML_STREAM_MAX_LINE_BYTES", str(1 << 20)))
+
+# A chunk of input lines: (1-based line numbers, raw lines). Lines that
+# exceeded the size limit are None.
+LineChunk = Tuple[List[int], List[Optional[bytes]]]
+
+
+async def read_lines(receive: Receive, max_line_bytes: int) -> AsyncIterator[Optional[bytes]]:
+    """
+    Yield the lines of an ASGI request body as they arrive, without ever
+    holding more than one body message plus one line in memory. Over-long
+    lines yield None. Raises ClientDisconnect if the client goes away.
+    """
+    buffer = bytearray()
+    skipping = False
+    more_body = True
+    while more_body:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            raise ClientDisconnect()
+        more_body = message.get("more_body", False)
+        body = message.get("body", b"")
+
+        start = 0
+        while True:
+            end = body.find(b"\n", start)
+            if end < 0:
+                break
+            if skipping:
+                skipping = False
+            elif len(buffer) + end - start > max_line_bytes:
+                yield None
+            else:
+                buffer += body[start:end]
+                yield bytes(buffer)
+            buffer.clear()
+            start = end + 1
+
+        if not skipping:
+            buffer += body[start:]
+            if len(buffer) > max_line_bytes:
+                buffer.clear()
+                skipping = True
+                yield None
+
+    if buffer and not skipping:
+        yield bytes(buffer)
+
+
+async def read_chunks(receive: Receive, chunk_size: int, max_line_bytes: int) -> AsyncIterator[LineChunk]:
+    """Group non-blank body lines into chunks of at most chunk_size lines"""
+    line_number = 0
+    numbers: List[int] = []
+    lines: List[Optional[bytes]] = []
+    async for line in read_lines(receive, max_line_bytes):
+        line_number += 1
+        if line is not None and not line.strip():
+            continue
+        numbers.append(line_number)
+        lines.append(line)
+        if len(lines) >= chunk_size:
+            yield numbers, lines
+            numbers, lines = [], []
+    if lines:
+        yield numbers, lines
+
+
+def parse_lines(lines: List[Optional[bytes]]) -> Tuple[List[Optional[dict]], List[Optional[str]]]:
+    """Decode a chunk of NDJSON lines into (records, errors)"""
+    records, errors = [], []
+    for line in lines:
+        if line is None:
+            records.append(None)
+            errors.append("Line too long")
+            continue
+        try:
+            record = json.loads(line)
+            if not isinstance(record, dict):
+                raise ValueError("expected a JSON object")
+            records.append(record)
+            errors.append(None)
+        except ValueError as e:
+            records.append(None)
+            errors.append(f"Invalid JSON: {str(e)}")
+    return records, errors
+
+
+class NDJSONStreamResponse(Response):
+    """
+    Streams the results of scoring an NDJSON request body.
+
+    The body is consumed chunk by chunk straight from the ASGI receive
+    channel. Each chunk's line numbers and raw lines are passed to
+    score_chunk, an async callable returning (encoded NDJSON bytes, records,
+    failures), and its output is sent before the next chunk is read. Memory
+    is therefore bounded by one chunk of input and output regardless of the
+    upload size, and a slow reader throttles how fast the body is consumed.
+    A client disconnect stops the stream after at most the chunk in
+    progress. The final line is a {"done": true, ...} summary, so clients can
+    tell a complete stream from a truncated one.
+    """
+
+    media_type = "application/x-ndjson"
+
+    def __init__(self, score_chunk: Callable[[List[int], List[Optional[bytes]]], Awaitable[Tuple[bytes, int, int]]],
+                 chunk_size: int = STREAM_CHUNK_SIZE, max_line_bytes: int = STREAM_MAX_LINE_BYTES):
+        super().__init__(content=None, media_type=self.media_type)
+        self.score_chunk = score_chunk
+        self.chunk_size = max(1, chunk_size)
+        self.max_line_bytes = max_line_bytes
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        mark_streaming()
+        records = failed = 0
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        try:
+            async for numbers, lines in read_chunks(receive, self.chunk_size, self.max_line_bytes):
+                body, count, errors = await self.score_chunk(numbers, lines)
+                records += count
+                failed += errors
+                await send({"type": "http.response.body", "body": body, "more_body": True})
+
+            summary = json.dumps({"done": True, "records": records, "failed": failed}).encode() + b"\n"
+            await send({"type": "http.response.body", "body": summary, "more_body": False})
+        except (ClientDisconnect, OSError):
+            logger.info(f"Client disconnected from stream after {records} records; work cancelled")
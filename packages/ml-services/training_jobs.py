@@ -0,0 +1,401 @@
+"""
+Asynchronous Training Jobs
+Fits models on the training executor and hot-swaps the finished bundle
+"""
+
+import asyncio
+import copy
+import json
+import multiprocessing
+import time
+import uuid
+import logging
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Union
+
+import numpy as np
+
+from executor import BoundedExecutor
+from hyperparameter_search import SEARCH_FOLDS, SEARCH_WORKERS, register_search_result, run_search
+from model_registry import ModelBundle, persist_bundle
+from training_data import TableSource, TrainingArrays, discard, training_arrays
+
+logger = logging.getLogger(__name__)
+
+# Number of warm-start increments used to report ensemble fitting progress
+PROGRESS_STEPS = 10
+
+# Scaled training rows kept with a bundle for reduced-precision accuracy checks
+REFERENCE_ROWS = 2000
+
+
+class TrainingConflict(Exception):
+    """Raised when an incremental job would race another job of the same model"""
+
+
+def _grow(model, X: np.ndarray, y: np.ndarray, start: int, total: int,
+          job_id: str, progress, low: float, high: float):
+    """
+    Grow a tree ensemble from start to total estimators in warm-start
+    increments, reporting progress from low to high. Earlier trees are kept.
+    """
+    steps = np.unique(np.linspace(start, total, PROGRESS_STEPS + 1).astype(int)[1:])
+    model.set_params(warm_start=True)
+    for n_estimators in steps:
+        model.set_params(n_estimators=int(n_estimators))
+        model.fit(X, y)
+        progress[job_id] = low + (high - low) * (n_estimators - start) / (total - start)
+    model.set_params(warm_start=False)
+
+
+def _reference_inputs(X_scaled: np.ndarray) -> np.ndarray:
+    sample = np.random.default_rng(0).permutation(len(X_scaled))[:REFERENCE_ROWS]
+    return np.asarray(X_scaled[np.sort(sample)], dtype=np.float64)
+
+
+def _scaler_affine(scaler, n_features: int):
+    mean = getattr(scaler, "mean_", None)
+    scale = getattr(scaler, "scale_", None)
+    return (
+        np.zeros(n_features) if mean is None else mean,
+        np.ones(n_features) if scale is None else scale,
+    )
+
+
+def rescale_thresholds(model, old_scaler, new_scaler):
+    """
+    Move the split thresholds of a fitted tree ensemble from old_scaler's
+    output space into new_scaler's, so existing trees make the same splits
+    on raw inputs after the scaler statistics change.
+    """
+    n_features = model.n_features_in_
+    old_mean, old_scale = _scaler_affine(old_scaler, n_features)
+    new_mean, new_scale = _scaler_affine(new_scaler, n_features)
+    for estimator in np.ravel(model.estimators_):
+        tree = estimator.tree_
+        state = tree.__getstate__()
+        nodes = state["nodes"].copy()
+        internal = nodes["left_child"] != -1
+        feature = nodes["feature"][internal]
+        raw = nodes["threshold"][internal] * old_scale[feature] + old_mean[feature]
+        nodes["threshold"][internal] = (raw - new_mean[feature]) / new_scale[feature]
+        state["nodes"] = nodes
+        tree.__setstate__(state)
+
+
+def fit_bundle(job_id: str, name: str, model, scaler, data: Union[TrainingArrays, TableSource],
+               version: str, progress) -> ModelBundle:
+    """
+    Fit a scaler and model pair into a new bundle.
+    Runs on the training executor (possibly in another process) and reports
+    progress into the shared progress mapping under job_id. data is (X, y)
+    or a table the worker reads itself.
+    """
+    started = time.perf_counter()
+    X, y = training_arrays(data)
+    scaler.fit(X)
+    # X belongs to this job, so it is scaled in place rather than copied
+    X_scaled = scaler.transform(X, copy=False)
+    progress[job_id] = 0.05
+
+    # Tree ensembles are grown in warm-start increments so progress can be
+    # reported; the fitted model is identical to a single fit.
+    params = model.get_params()
+    if "n_estimators" in params and "warm_start" in params and not params["warm_start"]:
+        _grow(model, X_scaled, y, 0, params["n_estimators"], job_id, progress, 0.05, 0.9)
+    else:
+        model.fit(X_scaled, y)
+        progress[job_id] = 0.9
+
+    bundle = ModelBundle(
+        name=name,
+        model=model,
+        scaler=scaler,
+        version=version,
+        trained_at=datetime.now().isoformat(),
+        metrics={
+            "samples": int(len(y)),
+            "train_score": float(model.score(X_scaled, y)),
+            "fit_seconds": time.perf_counter() - started,
+        },
+        reference_inputs=_reference_inputs(X_scaled),
+    )
+    progress[job_id] = 0.95
+    return bundle
+
+
+def update_bundle(job_id: str, name: str, model_path: str, parent_version: str,
+                  data: Union[TrainingArrays, TableSource], version: str, new_trees: int,
+                  max_trees: int, progress) -> ModelBundle:
+    """
+    Continue the persisted parent bundle on new data only.
+
+    The scaler statistics are updated with partial_fit and the parent's
+    split thresholds are moved into the updated scaling, so existing trees
+    predict exactly as before. new_trees trees fitted on the new data are
+    then appended with warm start: random forests average them with the
+    existing trees, gradient boosting adds stages fitted to the current
+    ensemble's residuals. Random forests keep at most max_trees trees
+    (0 for no limit), dropping the oldest first.
+    """
+    import joblib
+
+    started = time.perf_counter()
+    try:
+        with open(f"{model_path}/{name}_meta.json") as f:
+            disk_version = json.load(f).get("version")
+        if disk_version != parent_version:
+            raise RuntimeError(f"{name} model on disk is {disk_version}, expected {parent_version}")
+        model = joblib.load(f"{model_path}/{name}_model.pkl")
+        parent_scaler = joblib.load(f"{model_path}/scaler_{name}.pkl")
+        X, y = training_arrays(data)
+    finally:
+        # Uploads are deleted once read; a job failing before the read must not leave one behind
+        if isinstance(data, TableSource) and data.delete_after_load:
+            discard(data.path)
+
+    scaler = copy.deepcopy(parent_scaler)
+    scaler.partial_fit(X)
+    rescale_thresholds(model, parent_scaler, scaler)
+    X_scaled = scaler.transform(X, copy=False)
+    progress[job_id] = 0.05
+
+    parent_trees = len(model.estimators_)
+    _grow(model, X_scaled, y, parent_trees, parent_trees + new_trees, job_id, progress, 0.05, 0.9)
+    dropped = 0
+    if isinstance(model.estimators_, list) and 0 < max_trees < len(model.estimators_):
+        dropped = len(model.estimators_) - max_trees
+        model.estimators_ = model.estimators_[dropped:]
+        model.set_params(n_estimators=max_trees)
+
+    bundle = ModelBundle(
+        name=name,
+        model=model,
+        scaler=scaler,
+        version=version,
+        trained_at=datetime.now().isoformat(),
+        metrics={
+            "samples": int(len(y)),
+            "samples_seen": int(np.max(scaler.n_samples_seen_)),
+            "train_score": float(model.score(X_scaled, y)),
+            "fit_seconds": time.perf_counter() - started,
+            "parent_version": parent_version,
+            "trees_added": new_trees,
+            "trees_dropped": dropped,
+            "n_trees": len(model.estimators_),
+        },
+        reference_inputs=_reference_inputs(X_scaled),
+    )
+    progress[job_id] = 0.95
+    return bundle
+
+
+def search_bundle(job_id: str, name: str, model, scaler, data: Union[TrainingArrays, TableSource],
+                  version: str, n_trials: int, progress) -> ModelBundle:
+    """
+    Fit a bundle with the best hyperparameters found by a cross-validated
+    search (see hyperparameter_search.run_search), then register the winner
+    and its metrics in MLflow. The search takes progress up to 0.8 and the
+    final fit on all rows the rest.
+    """
+    started = time.perf_counter()
+    X, y = training_arrays(data)
+    scaler.fit(X)
+    X_scaled = scaler.transform(X, copy=False)
+    progress[job_id] = 0.02
+
+    def on_progress(fraction: float):
+        progress[job_id] = 0.02 + 0.78 * fraction
+
+    best, trials = run_search(model, X_scaled, y, n_trials=n_trials, on_progress=on_progress)
+    search_seconds = time.perf_counter() - started
+
+    model.set_params(**best.params)
+    params = model.get_params()
+    if "n_estimators" in params and "warm_start" in params and not params["warm_start"]:
+        _grow(model, X_scaled, y, 0, params["n_estimators"], job_id, progress, 0.8, 0.9)
+    else:
+        model.fit(X_scaled, y)
+        progress[job_id] = 0.9
+
+    scores = {
+        "samples": int(len(y)),
+        "train_score": float(model.score(X_scaled, y)),
+        "cv_score": best.mean_score,
+        "cv_score_std": float(np.std(best.scores)),
+        "trials": len(trials),
+        "trials_pruned": sum(t.pruned for t in trials),
+        "search_seconds": search_seconds,
+        "fit_seconds": time.perf_counter() - started,
+    }
+    registration = register_search_result(name, model, scores, {**best.params, "version": version})
+    bundle = ModelBundle(
+        name=name,
+        model=model,
+        scaler=scaler,
+        version=version,
+        trained_at=datetime.now().isoformat(),
+        metrics={
+            **scores,
+            "best_params": best.params,
+            "folds": SEARCH_FOLDS,
+            "search_workers": SEARCH_WORKERS,
+            "trial_results": [t.to_dict() for t in trials],
+            **registration,
+        },
+        reference_inputs=_reference_inputs(X_scaled),
+    )
+    progress[job_id] = 0.95
+    return bundle
+
+
+class TrainingJob:
+    """State of one submitted training job"""
+
+    def __init__(self, job_id: str, model_type: str, samples: int, version: str, mode: str = "full"):
+        self.job_id = job_id
+        self.model_type = model_type
+        self.mode = mode
+        self.samples = samples
+        self.version = version
+        self.status = "queued"
+        self.error: Optional[str] = None
+        self.metrics: Dict = {}
+        self.final_progress: Optional[float] = None
+        self.submitted_at = datetime.now()
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+
+    def to_dict(self, progress: float) -> Dict:
+        return {
+            "job_id": self.job_id,
+            "model_type": self.model_type,
+            "mode": self.mode,
+            "status": self.status,
+            "progress": progress,
+            "samples": self.samples,
+            "version": self.version,
+            "metrics": self.metrics,
+            "error": self.error,
+            "submitted_at": self.submitted_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+
+class TrainingJobManager:
+    """
+    Submits training jobs to a BoundedExecutor and publishes finished
+    bundles through on_complete. Submission raises ExecutorSaturated when the
+    training queue is full.
+    """
+
+    def __init__(self, executor: BoundedExecutor, model_path: str,
+                 on_complete: Callable[[ModelBundle], None], max_history: int = 100):
+        self.executor = executor
+        self.model_path = model_path
+        self.on_complete = on_complete
+        self.max_history = max_history
+        self.jobs: Dict[str, TrainingJob] = {}
+        self._tasks = set()
+        self._manager = None
+        self._progress = None
+
+    def _progress_map(self):
+        # Worker processes need a proxy to report progress back
+        if self._progress is None:
+            if self.executor.kind == "process":
+                self._manager = multiprocessing.get_context("spawn").Manager()
+                self._progress = self._manager.dict()
+            else:
+                self._progress = {}
+        return self._progress
+
+    def submit(self, model_type: str, model, scaler, data: Union[TrainingArrays, TableSource],
+               samples: int, version: str) -> TrainingJob:
+        job = TrainingJob(uuid.uuid4().hex, model_type, samples, version)
+        return self._submit(job, fit_bundle, model_type, model, scaler, data, version)
+
+    def submit_search(self, model_type: str, model, scaler, data: Union[TrainingArrays, TableSource],
+                      samples: int, version: str, n_trials: int) -> TrainingJob:
+        job = TrainingJob(uuid.uuid4().hex, model_type, samples, version, mode="search")
+        return self._submit(job, search_bundle, model_type, model, scaler, data, version, n_trials)
+
+    def submit_update(self, model_type: str, parent_version: str, data: Union[TrainingArrays, TableSource],
+                      samples: int, version: str, new_trees: int, max_trees: int) -> TrainingJob:
+        """
+        Submit an incremental job continuing parent_version. Raises
+        TrainingConflict while another job of the same model is unfinished,
+        since both would start from the same parent and one update would be lost.
+        """
+        if any(j.model_type == model_type and j.finished_at is None for j in self.jobs.values()):
+            raise TrainingConflict(f"Another {model_type} training job is still in progress")
+        job = TrainingJob(uuid.uuid4().hex, model_type, samples, version, mode="incremental")
+        return self._submit(
+            job, update_bundle, model_type, self.model_path, parent_version, data, version, new_trees, max_trees
+        )
+
+    def _submit(self, job: TrainingJob, fn: Callable, *args) -> TrainingJob:
+        progress = self._progress_map()
+        progress[job.job_id] = 0.0
+
+        future = self.executor.submit(fn, job.job_id, *args, progress)
+        self.jobs[job.job_id] = job
+        self._prune()
+
+        task = asyncio.ensure_future(self._watch(job, future))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    async def _watch(self, job: TrainingJob, future):
+        # The job counts as running once a worker picks it up
+        while not future.done() and not future.running():
+            await asyncio.sleep(0.05)
+        job.status = "running"
+        job.started_at = datetime.now()
+        try:
+            bundle = await self.executor.wait(future)
+            # Persist before publishing so disk and memory agree on the active version
+            bundle = await asyncio.get_running_loop().run_in_executor(
+                None, persist_bundle, self.model_path, bundle
+            )
+            self.on_complete(bundle)
+            job.metrics = bundle.metrics
+            job.status = "completed"
+            logger.info(f"Training job {job.job_id} completed ({job.model_type} {job.version})")
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e) or type(e).__name__
+            logger.error(f"Training job {job.job_id} failed: {job.error}")
+        finally:
+            job.final_progress = self.progress(job)
+            job.finished_at = datetime.now()
+            self._progress_map().pop(job.job_id, None)
+
+    def _prune(self):
+        finished = [j for j in self.jobs.values() if j.finished_at is not None]
+        while len(self.jobs) > self.max_history and finished:
+            self.jobs.pop(finished.pop(0).job_id, None)
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        job = self.jobs.get(job_id)
+        if job is None:
+            return None
+        return job.to_dict(self.progress(job))
+
+    def list(self) -> List[Dict]:
+        return [job.to_dict(self.progress(job)) for job in self.jobs.values()]
+
+    def progress(self, job: TrainingJob) -> float:
+        if job.final_progress is not None:
+            return job.final_progress
+        if job.status == "completed":
+            return 1.0
+        return float(self._progress_map().get(job.job_id, 0.0))
+
+    def shutdown(self):
+        if self._manager is not None:
+            self._manager.shutdown()
+            self._manager = None
+